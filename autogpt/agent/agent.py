@@ -5,9 +5,10 @@ from colorama import Fore, Style
 from autogpt.app import execute_command, get_command
 from autogpt.config import Config
 from autogpt.json_utils.json_fix_llm import fix_json_using_multiple_techniques
+from autogpt.json_utils.json_stream import JsonObjectStream
 from autogpt.json_utils.utilities import LLM_DEFAULT_RESPONSE_FORMAT, validate_json
 from autogpt.llm import chat_with_ai, create_chat_completion, create_chat_message
-from autogpt.llm.token_counter import count_string_tokens
+from autogpt.llm.token_counter import TokenLedger, count_string_tokens
 from autogpt.log_cycle.log_cycle import (
     FULL_MESSAGE_HISTORY_FILE_NAME,
     NEXT_ACTION_FILE_NAME,
@@ -64,10 +65,13 @@ class Agent:
         cfg = Config()
         self.ai_name = ai_name
         self.memory = memory
-        self.summary_memory = (
-            "I was created."  # Initial memory necessary to avoid hallucination
+        self.summary_memory = create_chat_message(
+            "system",
+            # Initial memory necessary to avoid hallucination
+            "This reminds you of these events from your past: \nI was created.",
         )
-        self.last_memory_index = 0
+        self.last_memory_index = -1
+        self.token_ledger = TokenLedger()
         self.full_message_history = full_message_history
         self.next_action_count = next_action_count
         self.command_registry = command_registry
@@ -78,6 +82,7 @@ class Agent:
         self.created_at = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.cycle_count = 0
         self.log_cycle_handler = LogCycleHandler()
+        self.thoughts_printed = False
 
     def start_interaction_loop(self):
         # Interaction Loop
@@ -108,7 +113,11 @@ class Agent:
                 )
                 break
             # Send message to AI, get response
-            with Spinner("Thinking... "):
+            self.thoughts_printed = False
+            with Spinner("Thinking... ") as spinner:
+                on_token = None
+                if cfg.stream_chat_completions:
+                    on_token = self._stream_reply_handler(spinner)
                 assistant_reply = chat_with_ai(
                     self,
                     self.system_prompt,
@@ -116,6 +125,7 @@ class Agent:
                     self.full_message_history,
                     self.memory,
                     cfg.fast_token_limit,
+                    on_token=on_token,
                 )  # TODO: This hardcodes the model to use GPT3.5. Make this an argument
 
             assistant_reply_json = fix_json_using_multiple_techniques(assistant_reply)
@@ -129,9 +139,10 @@ class Agent:
                 validate_json(assistant_reply_json, LLM_DEFAULT_RESPONSE_FORMAT)
                 # Get command name and arguments
                 try:
-                    print_assistant_thoughts(
-                        self.ai_name, assistant_reply_json, cfg.speak_mode
-                    )
+                    if not self.thoughts_printed:
+                        print_assistant_thoughts(
+                            self.ai_name, assistant_reply_json, cfg.speak_mode
+                        )
                     command_name, arguments = get_command(assistant_reply_json)
                     if cfg.speak_mode:
                         say_text(f"I want to execute {command_name}")
@@ -260,10 +271,12 @@ class Agent:
                 result = f"Command {command_name} returned: " f"{command_result}"
 
                 result_tlength = count_string_tokens(
-                    str(command_result), cfg.fast_llm_model
+                    str(command_result), cfg.fast_llm_model, limit=cfg.fast_token_limit
                 )
                 memory_tlength = count_string_tokens(
-                    str(self.summary_memory), cfg.fast_llm_model
+                    str(self.summary_memory),
+                    cfg.fast_llm_model,
+                    limit=cfg.fast_token_limit,
                 )
                 if result_tlength + memory_tlength + 600 > cfg.fast_token_limit:
                     result = f"Failure: command {command_name} returned too much output. \
@@ -289,6 +302,36 @@ class Agent:
                     "SYSTEM: ", Fore.YELLOW, "Unable to execute command"
                 )
 
+    def _stream_reply_handler(self, spinner: Spinner):
+        """Create a callback that parses the streamed reply of the AI.
+
+        The thoughts are printed as soon as they are complete, unless a plugin may
+        still change them in post-planning, and the command is checked as soon as
+        it is complete.
+        """
+        cfg = Config()
+        stream = JsonObjectStream()
+        print_early = not any(
+            plugin.can_handle_post_planning() for plugin in cfg.plugins
+        )
+
+        def on_token(token: str) -> None:
+            for key, value in stream.feed(token):
+                if key == "thoughts" and print_early:
+                    spinner.stop()
+                    print_assistant_thoughts(
+                        self.ai_name, {"thoughts": value}, cfg.speak_mode
+                    )
+                    self.thoughts_printed = True
+                elif key == "command":
+                    command_name, arguments = get_command({"command": value})
+                    if command_name == "Error:":
+                        logger.warn(f"Invalid command in reply: {arguments}")
+                    else:
+                        logger.debug(f"Command ready: {command_name} {arguments}")
+
+        return on_token
+
     def _resolve_pathlike_command_args(self, command_args):
         if "directory" in command_args and command_args["directory"] in {"", "/"}:
             command_args["directory"] = str(self.workspace.root)
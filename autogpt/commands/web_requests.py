@@ -6,7 +6,8 @@ from bs4 import BeautifulSoup
 from requests import Response
 
 from autogpt.config import Config
-from autogpt.processing.html import extract_hyperlinks, format_hyperlinks
+from autogpt.processing.html import extract_hyperlinks, extract_text, format_hyperlinks
+from autogpt.processing.page_cache import PageCache, content_hash, extraction_mode
 from autogpt.url_utils.validators import validate_url
 
 CFG = Config()
@@ -17,13 +18,14 @@ session.headers.update({"User-Agent": CFG.user_agent})
 
 @validate_url
 def get_response(
-    url: str, timeout: int = 10
+    url: str, timeout: int = 10, headers: dict | None = None
 ) -> tuple[None, str] | tuple[Response, None]:
     """Get the response from a URL
 
     Args:
         url (str): The URL to get the response from
         timeout (int): The timeout for the HTTP request
+        headers (dict, optional): Additional headers of the HTTP request
 
     Returns:
         tuple[None, str] | tuple[Response, None]: The response and error message
@@ -33,7 +35,7 @@ def get_response(
         requests.exceptions.RequestException: If the HTTP request fails
     """
     try:
-        response = session.get(url, timeout=timeout)
+        response = session.get(url, timeout=timeout, headers=headers)
 
         # Check if the response contains an HTTP error
         if response.status_code >= 400:
@@ -59,23 +61,37 @@ def scrape_text(url: str) -> str:
     Returns:
         str: The scraped text
     """
-    response, error_message = get_response(url)
+    cached = PageCache().get_page(url, extraction_mode()) if CFG.page_cache else None
+    if cached and cached.fresh:
+        return cached.text
+
+    response, error_message = get_response(
+        url, headers=cached.validators() if cached else None
+    )
     if error_message:
         return error_message
     if not response:
         return "Error: Could not get response"
 
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    for script in soup(["script", "style"]):
-        script.extract()
-
-    text = soup.get_text()
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = "\n".join(chunk for chunk in chunks if chunk)
-
-    return text
+    if CFG.page_cache:
+        page_hash = content_hash(response.content)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if cached and (response.status_code == 304 or cached.content_hash == page_hash):
+            # The page has not changed, so neither has its text. A 304 response
+            # need not repeat the validators, so keep the stored ones.
+            text = cached.text
+            page_hash = cached.content_hash
+            etag = etag or cached.etag
+            last_modified = last_modified or cached.last_modified
+        else:
+            text = extract_text(response.text, CFG.browse_main_content_only)
+        PageCache().put_page(
+            url, extraction_mode(), text, page_hash, etag, last_modified
+        )
+        return text
+
+    return extract_text(response.text, CFG.browse_main_content_only)
 
 
 def scrape_links(url: str) -> str | list[str]:
@@ -21,7 +21,8 @@ from webdriver_manager.firefox import GeckoDriverManager
 import autogpt.processing.text as summary
 from autogpt.commands.command import command
 from autogpt.config import Config
-from autogpt.processing.html import extract_hyperlinks, format_hyperlinks
+from autogpt.processing.html import extract_hyperlinks, extract_text, format_hyperlinks
+from autogpt.processing.page_cache import PageCache, content_hash, extraction_mode
 from autogpt.url_utils.validators import validate_url
 
 FILE_DIR = Path(__file__).parent.parent
@@ -44,6 +45,16 @@ def browse_website(url: str, question: str) -> tuple[str, WebDriver]:
     Returns:
         Tuple[str, WebDriver]: The answer and links to the user and the webdriver
     """
+    if CFG.page_cache:
+        cached = PageCache().get_page(url, extraction_mode(browser=True))
+        if cached and cached.fresh and cached.links is not None:
+            summary_text = summary.summarize_text(url, cached.text, question)
+            return (
+                f"Answer gathered from website: {summary_text} \n \n Links: "
+                f"{cached.links}",
+                None,
+            )
+
     try:
         driver, text = scrape_text_with_selenium(url)
     except WebDriverException as e:
@@ -60,6 +71,10 @@ def browse_website(url: str, question: str) -> tuple[str, WebDriver]:
     if len(links) > 5:
         links = links[:5]
     close_browser(driver)
+    if CFG.page_cache:
+        PageCache().put_page(
+            url, extraction_mode(browser=True), text, content_hash(text), links=links
+        )
     return f"Answer gathered from website: {summary_text} \n \n Links: {links}", driver
 
 
@@ -122,15 +137,7 @@ def scrape_text_with_selenium(url: str) -> tuple[WebDriver, str]:
 
     # Get the HTML content directly from the browser's DOM
     page_source = driver.execute_script("return document.body.outerHTML;")
-    soup = BeautifulSoup(page_source, "html.parser")
-
-    for script in soup(["script", "style"]):
-        script.extract()
-
-    text = soup.get_text()
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = "\n".join(chunk for chunk in chunks if chunk)
+    text = extract_text(page_source, CFG.browse_main_content_only)
     return driver, text
 
 
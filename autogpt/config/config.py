@@ -45,10 +45,59 @@ class Config(metaclass=Singleton):
         self.embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
         self.embedding_tokenizer = os.getenv("EMBEDDING_TOKENIZER", "cl100k_base")
         self.embedding_token_limit = int(os.getenv("EMBEDDING_TOKEN_LIMIT", 8191))
+        self.embedding_cache = os.getenv("EMBEDDING_CACHE", "False") == "True"
+        self.embedding_cache_path = os.getenv(
+            "EMBEDDING_CACHE_PATH", "~/.cache/auto-gpt/embeddings.sqlite3"
+        )
+        self.embedding_cache_max_entries = int(
+            os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 100000)
+        )
+        self.embedding_batch_window_ms = float(
+            os.getenv("EMBEDDING_BATCH_WINDOW_MS", 0)
+        )
+        self.embedding_batch_max_texts = int(
+            os.getenv("EMBEDDING_BATCH_MAX_TEXTS", 256)
+        )
+        self.chat_cache = os.getenv("CHAT_CACHE", "False") == "True"
+        self.chat_cache_path = os.getenv(
+            "CHAT_CACHE_PATH", "~/.cache/auto-gpt/chat_completions.sqlite3"
+        )
+        self.chat_cache_ttl = float(os.getenv("CHAT_CACHE_TTL", 7 * 24 * 3600))
+        self.chat_cache_max_entries = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", 10000))
+        self.stream_chat_completions = (
+            os.getenv("STREAM_CHAT_COMPLETIONS", "False") == "True"
+        )
+        self.background_summary = os.getenv("BACKGROUND_SUMMARY", "False") == "True"
+        self.openai_max_concurrency = int(os.getenv("OPENAI_MAX_CONCURRENCY", 8))
+        self.openai_retry_max_wait = float(os.getenv("OPENAI_RETRY_MAX_WAIT", 300))
+        self.openai_rate_limits = {}
+        for limit in filter(None, os.getenv("OPENAI_RATE_LIMITS", "").split(",")):
+            model, rpm, tpm = limit.strip().rsplit(":", 2)
+            self.openai_rate_limits[model] = (int(rpm), int(tpm))
         self.browse_chunk_max_length = int(os.getenv("BROWSE_CHUNK_MAX_LENGTH", 3000))
         self.browse_spacy_language_model = os.getenv(
             "BROWSE_SPACY_LANGUAGE_MODEL", "en_core_web_sm"
         )
+        self.browse_main_content_only = (
+            os.getenv("BROWSE_MAIN_CONTENT_ONLY", "True") == "True"
+        )
+        self.browse_summary_map_reduce = (
+            os.getenv("BROWSE_SUMMARY_MAP_REDUCE", "False") == "True"
+        )
+        self.browse_summary_workers = int(os.getenv("BROWSE_SUMMARY_WORKERS", 4))
+        self.browse_relevant_chunks = int(os.getenv("BROWSE_RELEVANT_CHUNKS", 0))
+        self.browse_relevance_threshold = float(
+            os.getenv("BROWSE_RELEVANCE_THRESHOLD", -1)
+        )
+        self.page_cache = os.getenv("PAGE_CACHE", "False") == "True"
+        self.page_cache_path = os.getenv(
+            "PAGE_CACHE_PATH", "~/.cache/auto-gpt/pages.sqlite3"
+        )
+        self.page_cache_ttl = float(os.getenv("PAGE_CACHE_TTL", 3600))
+        self.page_cache_summary_ttl = float(
+            os.getenv("PAGE_CACHE_SUMMARY_TTL", 7 * 24 * 3600)
+        )
+        self.page_cache_max_entries = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", 1000))
 
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.temperature = float(os.getenv("TEMPERATURE", "0"))
@@ -140,6 +189,15 @@ class Config(metaclass=Singleton):
 
         self.memory_backend = os.getenv("MEMORY_BACKEND", "local")
 
+        # Local cache settings
+        self.local_cache_persist = os.getenv("LOCAL_CACHE_PERSIST", "False") == "True"
+        self.local_cache_sync_interval = int(os.getenv("LOCAL_CACHE_SYNC_INTERVAL", 16))
+        self.local_cache_dtype = os.getenv("LOCAL_CACHE_DTYPE", "float32")
+        self.local_cache_rerank_factor = int(os.getenv("LOCAL_CACHE_RERANK_FACTOR", 4))
+        self.local_cache_index = os.getenv("LOCAL_CACHE_INDEX", "flat")
+        self.local_cache_ivf_nlist = int(os.getenv("LOCAL_CACHE_IVF_NLIST", 256))
+        self.local_cache_ivf_nprobe = int(os.getenv("LOCAL_CACHE_IVF_NPROBE", 16))
+
         self.plugins_dir = os.getenv("PLUGINS_DIR", "plugins")
         self.plugins: List[AutoGPTPluginTemplate] = []
         self.plugins_openai = []
@@ -0,0 +1,85 @@
+"""Incremental parsing of a JSON object that arrives in pieces."""
+from __future__ import annotations
+
+import json
+from typing import Any, List, Tuple
+
+
+class JsonObjectStream:
+    """Parses a streamed JSON object and reports each top-level member as soon as
+    its value is complete.
+
+    Text before the first `{` is ignored, so replies with a short preamble still
+    work. Characters are scanned once to track nesting and strings, and the
+    object is only decoded up to a member that has just ended.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.start = -1
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.seen_keys: set[str] = set()
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Add the next piece of the reply.
+
+        Args:
+        chunk (str): The text that arrived since the last call.
+
+        Returns:
+        List[Tuple[str, Any]]: The top-level members completed by this piece, as
+            (key, value) pairs in reply order.
+        """
+        self.text += chunk
+        members = []
+        while self.position < len(self.text) and not self.done:
+            char = self.text[self.position]
+            self.position += 1
+            if self.start < 0:
+                if char == "{":
+                    self.start = self.position - 1
+                    self.depth = 1
+                continue
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.done = True
+                    members += self._new_members(self.text[self.start : self.position])
+                elif self.depth == 1:
+                    # a nested value has just been closed
+                    prefix = self.text[self.start : self.position] + "}"
+                    members += self._new_members(prefix)
+            elif char == "," and self.depth == 1:
+                prefix = self.text[self.start : self.position - 1] + "}"
+                members += self._new_members(prefix)
+        return members
+
+    def _new_members(self, prefix: str) -> List[Tuple[str, Any]]:
+        """Decode a closed prefix of the object and return its unseen members."""
+        try:
+            parsed = json.loads(prefix)
+        except json.JSONDecodeError:
+            return []
+        if not isinstance(parsed, dict):
+            return []
+        members = [(k, v) for k, v in parsed.items() if k not in self.seen_keys]
+        self.seen_keys.update(parsed)
+        return members
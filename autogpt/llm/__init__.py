@@ -14,6 +14,7 @@ from autogpt.llm.llm_utils import (
     chunked_tokens,
     create_chat_completion,
     get_ada_embedding,
+    get_ada_embeddings,
 )
 from autogpt.llm.modelsinfo import COSTS
 from autogpt.llm.token_counter import count_message_tokens, count_string_tokens
@@ -33,6 +34,7 @@ __all__ = [
     "call_ai_function",
     "create_chat_completion",
     "get_ada_embedding",
+    "get_ada_embeddings",
     "chunked_tokens",
     "COSTS",
     "count_message_tokens",
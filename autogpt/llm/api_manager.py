@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from typing import Iterator
+
 import openai
 
 from autogpt.config import Config
 from autogpt.llm.modelsinfo import COSTS
+from autogpt.llm.token_counter import count_message_tokens, count_string_tokens
 from autogpt.logs import logger
 from autogpt.singleton import Singleton
 
@@ -28,6 +31,7 @@ class ApiManager(metaclass=Singleton):
         temperature: float = None,
         max_tokens: int | None = None,
         deployment_id=None,
+        stream: bool = False,
     ) -> str:
         """
         Create a chat completion and update the cost.
@@ -36,8 +40,9 @@ class ApiManager(metaclass=Singleton):
         model (str): The model to use for the API call.
         temperature (float): The temperature to use for the API call.
         max_tokens (int): The maximum number of tokens for the API call.
+        stream (bool): Whether to return the reply in pieces as it is generated.
         Returns:
-        str: The AI's response.
+        str: The AI's response, or an iterator over its pieces when streaming.
         """
         cfg = Config()
         if temperature is None:
@@ -50,6 +55,7 @@ class ApiManager(metaclass=Singleton):
                 temperature=temperature,
                 max_tokens=max_tokens,
                 api_key=cfg.openai_api_key,
+                stream=stream,
             )
         else:
             response = openai.ChatCompletion.create(
@@ -58,13 +64,45 @@ class ApiManager(metaclass=Singleton):
                 temperature=temperature,
                 max_tokens=max_tokens,
                 api_key=cfg.openai_api_key,
+                stream=stream,
             )
+        if stream:
+            return self.stream_content(response, messages, model)
         logger.debug(f"Response: {response}")
         prompt_tokens = response.usage.prompt_tokens
         completion_tokens = response.usage.completion_tokens
         self.update_cost(prompt_tokens, completion_tokens, model)
         return response
 
+    def stream_content(
+        self, chunks: Iterator, messages: list, model: str
+    ) -> Iterator[str]:
+        """
+        Yield the content of a streamed chat completion and update the cost once
+        it is complete. Streamed responses carry no usage, so the tokens are
+        counted locally.
+
+        Args:
+        chunks (Iterator): The chunks of a streamed chat completion.
+        messages (list): The messages that were sent to the API.
+        model (str): The model used for the API call.
+        Yields:
+        str: The pieces of the AI's response.
+        """
+        content = []
+        for chunk in chunks:
+            delta = chunk["choices"][0]["delta"].get("content")
+            if delta:
+                content.append(delta)
+                yield delta
+        content = "".join(content)
+        logger.debug(f"Response: {content}")
+        self.update_cost(
+            count_message_tokens(messages, model),
+            count_string_tokens(content, model),
+            model,
+        )
+
     def update_cost(self, prompt_tokens, completion_tokens, model):
         """
         Update the total cost, prompt tokens, and completion tokens.
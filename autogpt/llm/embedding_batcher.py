@@ -0,0 +1,92 @@
+"""Coalesces embedding requests made concurrently from several threads."""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from autogpt.config import Config
+from autogpt.logs import logger
+from autogpt.singleton import Singleton
+
+EmbedFunction = Callable[..., np.ndarray]
+
+
+class PendingBatch:
+    """Texts waiting to be embedded together, and the futures of their callers."""
+
+    def __init__(self, embed: EmbedFunction, kwargs: dict) -> None:
+        self.embed = embed
+        self.kwargs = kwargs
+        self.texts: List[str] = []
+        self.futures: List[Future] = []
+        self.full = threading.Event()
+
+    def dispatch(self) -> None:
+        """Embed all texts of the batch and hand the rows out to the futures."""
+        try:
+            embeddings = self.embed(self.texts, **self.kwargs)
+        except Exception as e:
+            for future in self.futures:
+                future.set_exception(e)
+            return
+        for future, embedding in zip(self.futures, embeddings):
+            future.set_result(embedding)
+
+
+class EmbeddingBatcher(metaclass=Singleton):
+    """Collects the texts of concurrent embedding requests into one API call.
+
+    The first caller of a batch becomes its leader: it waits up to `window`
+    seconds for other callers to add their texts, or until the batch holds
+    `max_texts` texts, and then makes the request for everyone. No request is
+    held longer than `window` before it is sent.
+    """
+
+    def __init__(self, window: float | None = None, max_texts: int | None = None):
+        cfg = Config()
+        self.window = (
+            window if window is not None else cfg.embedding_batch_window_ms / 1000
+        )
+        self.max_texts = max_texts or cfg.embedding_batch_max_texts
+        self.lock = threading.Lock()
+        self.batches: Dict[Tuple, PendingBatch] = {}
+
+    def embed(self, embed: EmbedFunction, texts: List[str], **kwargs) -> np.ndarray:
+        """
+        Embed texts together with the texts of concurrent callers.
+
+        Args:
+        embed (EmbedFunction): Embeds a list of texts into one row per text.
+        texts (List[str]): The texts to embed.
+        kwargs: Other arguments to pass to `embed`. Only calls with the same
+            arguments are batched together.
+
+        Returns:
+        np.ndarray: The embeddings, one row per text in the same order.
+        """
+        key = (embed, tuple(sorted(kwargs.items())))
+        futures = [Future() for _ in texts]
+        with self.lock:
+            batch = self.batches.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = self.batches[key] = PendingBatch(embed, kwargs)
+            batch.texts.extend(texts)
+            batch.futures.extend(futures)
+            if len(batch.texts) >= self.max_texts:
+                # later callers start a new batch
+                del self.batches[key]
+                batch.full.set()
+
+        if is_leader:
+            batch.full.wait(self.window)
+            with self.lock:
+                if self.batches.get(key) is batch:
+                    del self.batches[key]
+            logger.debug(f"Embedding a batch of {len(batch.texts)} texts")
+            batch.dispatch()
+
+        return np.stack([future.result() for future in futures])
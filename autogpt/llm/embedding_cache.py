@@ -0,0 +1,106 @@
+"""Disk-backed cache for embeddings, shared by all agents on the same host."""
+from __future__ import annotations
+
+import hashlib
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from autogpt.config import Config
+from autogpt.llm.sqlite_cache import SQLiteCache
+from autogpt.logs import logger
+from autogpt.singleton import Singleton
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+# SQLite limits the number of parameters per query
+MAX_QUERY_HASHES = 500
+
+
+def text_hash(text: str) -> str:
+    """Get the SHA-256 hex digest of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache(SQLiteCache, metaclass=Singleton):
+    """SQLite cache of embeddings keyed by model and text hash.
+
+    Embeddings are stored as float32 blobs. Once the cache holds more than
+    `max_entries` embeddings, the least recently used ones are evicted. SQLite
+    handles locking between processes, so agents on the same host can share one
+    cache file.
+    """
+
+    schema = SCHEMA
+
+    def __init__(
+        self, path: str | Path | None = None, max_entries: int | None = None
+    ) -> None:
+        cfg = Config()
+        super().__init__(
+            path or cfg.embedding_cache_path,
+            max_entries or cfg.embedding_cache_max_entries,
+        )
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up the embeddings of several texts, None for each miss."""
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        with self.lock, self.connection:
+            for start in range(0, len(hashes), MAX_QUERY_HASHES):
+                batch = hashes[start : start + MAX_QUERY_HASHES]
+                placeholders = ", ".join("?" * len(batch))
+                rows = self.connection.execute(
+                    "SELECT text_hash, embedding FROM embeddings"
+                    f" WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *batch),
+                )
+                found.update(rows)
+            self.connection.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(time.time(), model, hash_) for hash_ in found],
+            )
+
+        embeddings = [
+            np.frombuffer(found[hash_], dtype=np.float32) if hash_ in found else None
+            for hash_ in hashes
+        ]
+        hits = sum(embedding is not None for embedding in embeddings)
+        self.hits += hits
+        self.misses += len(texts) - hits
+        logger.debug(
+            f"Embedding cache: {hits} hits, {len(texts) - hits} misses"
+            f" ({self.hits} hits, {self.misses} misses in total)"
+        )
+        return embeddings
+
+    def put_many(
+        self, model: str, texts: List[str], embeddings: Sequence[np.ndarray]
+    ) -> None:
+        """Store the embeddings of several texts, evicting the least recently used
+        embeddings if the cache got too big."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        model,
+                        text_hash(text),
+                        np.asarray(embedding, dtype=np.float32).tobytes(),
+                        now,
+                    )
+                    for text, embedding in zip(texts, embeddings)
+                ],
+            )
+            self.evict("embeddings")
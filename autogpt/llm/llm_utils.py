@@ -1,21 +1,30 @@
 from __future__ import annotations
 
 import functools
-import time
 from itertools import islice
-from typing import List, Optional
+from typing import Callable, List, Optional, Sequence, Tuple
 
 import numpy as np
 import openai
 import tiktoken
-from colorama import Fore, Style
-from openai.error import APIError, RateLimitError, Timeout
+from colorama import Fore
+from openai.error import RateLimitError
 
 from autogpt.config import Config
 from autogpt.llm.api_manager import ApiManager
 from autogpt.llm.base import Message
+from autogpt.llm.embedding_batcher import EmbeddingBatcher
+from autogpt.llm.embedding_cache import EmbeddingCache, text_hash
+from autogpt.llm.response_cache import ResponseCache, response_key
+from autogpt.llm.retry import CircuitOpenError, RetryPolicy
+from autogpt.llm.scheduler import Priority, RequestScheduler
+from autogpt.llm.single_flight import SingleFlight
+from autogpt.llm.token_counter import count_message_tokens
 from autogpt.logs import logger
 
+# The maximum number of inputs the OpenAI API accepts per embedding request
+EMBEDDING_BATCH_SIZE = 2048
+
 
 def retry_openai_api(
     num_retries: int = 10,
@@ -26,44 +35,18 @@ def retry_openai_api(
 
     Args:
         num_retries int: Number of retries. Defaults to 10.
-        backoff_base float: Base for exponential backoff. Defaults to 2.
+        backoff_base float: Base delay in seconds of the jittered backoff.
+            Defaults to 2.
         warn_user bool: Whether to warn the user. Defaults to True.
     """
-    retry_limit_msg = f"{Fore.RED}Error: " f"Reached rate limit, passing...{Fore.RESET}"
-    api_key_error_msg = (
-        f"Please double check that you have setup a "
-        f"{Fore.CYAN + Style.BRIGHT}PAID{Style.RESET_ALL} OpenAI API Account. You can "
-        f"read more here: {Fore.CYAN}https://docs.agpt.co/setup/#getting-an-api-key{Fore.RESET}"
-    )
-    backoff_msg = (
-        f"{Fore.RED}Error: API Bad gateway. Waiting {{backoff}} seconds...{Fore.RESET}"
+    policy = RetryPolicy(
+        num_retries=num_retries, base_delay=backoff_base, warn_user=warn_user
     )
 
     def _wrapper(func):
         @functools.wraps(func)
         def _wrapped(*args, **kwargs):
-            user_warned = not warn_user
-            num_attempts = num_retries + 1  # +1 for the first attempt
-            for attempt in range(1, num_attempts + 1):
-                try:
-                    return func(*args, **kwargs)
-
-                except RateLimitError:
-                    if attempt == num_attempts:
-                        raise
-
-                    logger.debug(retry_limit_msg)
-                    if not user_warned:
-                        logger.double_check(api_key_error_msg)
-                        user_warned = True
-
-                except APIError as e:
-                    if (e.http_status != 502) or (attempt == num_attempts):
-                        raise
-
-                backoff = backoff_base ** (attempt + 2)
-                logger.debug(backoff_msg.format(backoff=backoff))
-                time.sleep(backoff)
+            return policy.call(func, *args, **kwargs)
 
         return _wrapped
 
@@ -106,6 +89,57 @@ def call_ai_function(
     return create_chat_completion(model=model, messages=messages, temperature=0)
 
 
+def handle_chat_completion(
+    messages: List[Message],  # type: ignore
+    model: Optional[str],
+    temperature: float,
+    max_tokens: Optional[int],
+) -> Optional[str]:
+    """Let the first plugin that can handle the chat completion create it
+
+    Returns:
+        Optional[str]: The response of the plugin, None if no plugin handled it
+    """
+    for plugin in Config().plugins:
+        if plugin.can_handle_chat_completion(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        ):
+            message = plugin.handle_chat_completion(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+            if message is not None:
+                return message
+    return None
+
+
+def chat_cache_key(
+    messages: List[Message],  # type: ignore
+    model: Optional[str],
+    temperature: float,
+    max_tokens: Optional[int],
+    cache: Optional[bool],
+) -> Optional[str]:
+    """Get the key of a chat completion in the response cache, None if it should
+    not be cached"""
+    if Config().chat_cache and (cache or (cache is None and temperature == 0)):
+        return response_key(messages, model, temperature, max_tokens)
+    return None
+
+
+def on_chat_response(response: str) -> str:
+    """Pass a chat completion response through the plugins that handle it"""
+    for plugin in Config().plugins:
+        if plugin.can_handle_on_response():
+            response = plugin.on_response(response)
+    return response
+
+
 # Overly simple abstraction until we create something better
 # simple retry mechanism when getting a rate error or a bad gateway
 def create_chat_completion(
@@ -113,6 +147,9 @@ def create_chat_completion(
     model: Optional[str] = None,
     temperature: float = None,
     max_tokens: Optional[int] = None,
+    cache: Optional[bool] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    priority: Priority = Priority.NORMAL,
 ) -> str:
     """Create a chat completion using the OpenAI API
 
@@ -121,6 +158,12 @@ def create_chat_completion(
         model (str, optional): The model to use. Defaults to None.
         temperature (float, optional): The temperature to use. Defaults to 0.9.
         max_tokens (int, optional): The max tokens to use. Defaults to None.
+        cache (bool, optional): Whether to use the response cache if CHAT_CACHE is
+            enabled. Defaults to None, which caches only temperature 0 requests.
+        on_token (Callable[[str], None], optional): Streams the response and calls
+            this with every piece as it arrives. Defaults to None.
+        priority (Priority, optional): The priority of the request if the model is
+            rate limited by OPENAI_RATE_LIMITS. Defaults to Priority.NORMAL.
 
     Returns:
         str: The response from the chat completion
@@ -129,85 +172,70 @@ def create_chat_completion(
     if temperature is None:
         temperature = cfg.temperature
 
-    num_retries = 10
-    warned_user = False
     logger.debug(
         f"{Fore.GREEN}Creating chat completion with model {model}, temperature {temperature}, max_tokens {max_tokens}{Fore.RESET}"
     )
-    for plugin in cfg.plugins:
-        if plugin.can_handle_chat_completion(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-        ):
-            message = plugin.handle_chat_completion(
-                messages=messages,
+    message = handle_chat_completion(messages, model, temperature, max_tokens)
+    if message is not None:
+        if on_token:
+            on_token(message)
+        return message
+    cache_key = chat_cache_key(messages, model, temperature, max_tokens, cache)
+    resp = ResponseCache().get(cache_key) if cache_key else None
+
+    if resp is None:
+        api_manager = ApiManager()
+        kwargs = {}
+        if cfg.use_azure:
+            kwargs["deployment_id"] = cfg.get_azure_deployment_id_for_model(model)
+        scheduler = RequestScheduler()
+        if scheduler.schedules(model):
+            tokens = count_message_tokens(messages, model) + (max_tokens or 0)
+
+        def send():
+            if scheduler.schedules(model):
+                scheduler.acquire(model, tokens, priority)
+            return api_manager.create_chat_completion(
                 model=model,
+                messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
+                stream=on_token is not None,
+                **kwargs,
             )
-            if message is not None:
-                return message
-    api_manager = ApiManager()
-    response = None
-    for attempt in range(num_retries):
-        backoff = 2 ** (attempt + 2)
+
         try:
-            if cfg.use_azure:
-                response = api_manager.create_chat_completion(
-                    deployment_id=cfg.get_azure_deployment_id_for_model(model),
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                )
+            if temperature == 0 and on_token is None:
+                # identical deterministic requests can share one response
+                key = "chat:" + response_key(messages, model, temperature, max_tokens)
+                response = SingleFlight().do(key, lambda: RetryPolicy().call(send))
             else:
-                response = api_manager.create_chat_completion(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                )
-            break
-        except RateLimitError:
-            logger.debug(
-                f"{Fore.RED}Error: ", f"Reached rate limit, passing...{Fore.RESET}"
+                response = RetryPolicy().call(send)
+        except (RateLimitError, CircuitOpenError):
+            logger.typewriter_log(
+                "FAILED TO GET RESPONSE FROM OPENAI",
+                Fore.RED,
+                "Auto-GPT has failed to get a response from OpenAI's services. "
+                + f"Try running Auto-GPT again, and if the problem the persists try running it with `{Fore.CYAN}--debug{Fore.RESET}`.",
             )
-            if not warned_user:
-                logger.double_check(
-                    f"Please double check that you have setup a {Fore.CYAN + Style.BRIGHT}PAID{Style.RESET_ALL} OpenAI API Account. "
-                    + f"You can read more here: {Fore.CYAN}https://docs.agpt.co/setup/#getting-an-api-key{Fore.RESET}"
-                )
-                warned_user = True
-        except (APIError, Timeout) as e:
-            if e.http_status != 502:
-                raise
-            if attempt == num_retries - 1:
-                raise
-        logger.debug(
-            f"{Fore.RED}Error: ",
-            f"API Bad gateway. Waiting {backoff} seconds...{Fore.RESET}",
-        )
-        time.sleep(backoff)
-    if response is None:
-        logger.typewriter_log(
-            "FAILED TO GET RESPONSE FROM OPENAI",
-            Fore.RED,
-            "Auto-GPT has failed to get a response from OpenAI's services. "
-            + f"Try running Auto-GPT again, and if the problem the persists try running it with `{Fore.CYAN}--debug{Fore.RESET}`.",
-        )
-        logger.double_check()
-        if cfg.debug_mode:
-            raise RuntimeError(f"Failed to get response after {num_retries} retries")
+            logger.double_check()
+            if cfg.debug_mode:
+                raise RuntimeError("Failed to get response after retrying")
+            else:
+                quit(1)
+        if on_token is None:
+            resp = response.choices[0].message["content"]
         else:
-            quit(1)
-    resp = response.choices[0].message["content"]
-    for plugin in cfg.plugins:
-        if not plugin.can_handle_on_response():
-            continue
-        resp = plugin.on_response(resp)
-    return resp
+            pieces = []
+            for piece in response:
+                on_token(piece)
+                pieces.append(piece)
+            resp = "".join(pieces)
+        if cache_key:
+            ResponseCache().put(cache_key, resp)
+    elif on_token:
+        on_token(resp)
+    return on_chat_response(resp)
 
 
 def batched(iterable, n):
@@ -227,34 +255,189 @@ def chunked_tokens(text, tokenizer_name, chunk_length):
     yield from chunks_iterator
 
 
-def get_ada_embedding(text: str) -> List[float]:
+def embedding_key(model: str, text: str) -> str:
+    """Get the key that identifies identical in-flight embedding requests."""
+    return f"embedding:{model}:{text_hash(text)}"
+
+
+def get_ada_embedding(text: str) -> np.ndarray:
     """Get an embedding from the ada model.
 
     Args:
         text (str): The text to embed.
 
     Returns:
-        List[float]: The embedding.
+        np.ndarray: The embedding.
     """
     cfg = Config()
     model = cfg.embedding_model
     text = text.replace("\n", " ")
 
+    if cfg.embedding_cache:
+        (embedding,) = EmbeddingCache().get_many(model, [text])
+        if embedding is not None:
+            return embedding
+
     if cfg.use_azure:
         kwargs = {"engine": cfg.get_azure_deployment_id_for_model(model)}
     else:
         kwargs = {"model": model}
 
-    embedding = create_embedding(text, **kwargs)
-    return embedding
+    def embed() -> np.ndarray:
+        if cfg.embedding_batch_window_ms > 0:
+            embedding = EmbeddingBatcher().embed(create_embeddings, [text], **kwargs)[0]
+        else:
+            embedding = create_embedding(text, **kwargs)
+        if cfg.embedding_cache:
+            EmbeddingCache().put_many(model, [text], [embedding])
+        return embedding
+
+    return SingleFlight().do(embedding_key(model, text), embed)
+
+
+def get_ada_embeddings(texts: List[str]) -> np.ndarray:
+    """Get embeddings for several texts from the ada model in as few requests as
+    possible. Cached embeddings are not requested again.
+
+    Args:
+        texts (List[str]): The texts to embed.
+
+    Returns:
+        np.ndarray: The embeddings, one row per text in the same order.
+    """
+    cfg = Config()
+    model = cfg.embedding_model
+    texts = [text.replace("\n", " ") for text in texts]
+
+    if cfg.embedding_cache:
+        cached = EmbeddingCache().get_many(model, texts)
+    else:
+        cached = [None] * len(texts)
+    missing = [i for i, embedding in enumerate(cached) if embedding is None]
+    if not missing:
+        return np.array(cached, dtype=np.float32)
+
+    if cfg.use_azure:
+        kwargs = {"engine": cfg.get_azure_deployment_id_for_model(model)}
+    else:
+        kwargs = {"model": model}
+
+    missing_texts = [texts[i] for i in missing]
+
+    def embed(own: List[int]) -> np.ndarray:
+        own_texts = [missing_texts[i] for i in own]
+        if cfg.embedding_batch_window_ms > 0:
+            embeddings = EmbeddingBatcher().embed(
+                create_embeddings, own_texts, **kwargs
+            )
+        else:
+            embeddings = create_embeddings(own_texts, **kwargs)
+        if cfg.embedding_cache:
+            EmbeddingCache().put_many(model, own_texts, embeddings)
+        return embeddings
+
+    missing_embeddings = np.stack(
+        SingleFlight().do_many(
+            [embedding_key(model, text) for text in missing_texts], embed
+        )
+    )
+    if len(missing) == len(texts):
+        return missing_embeddings
+
+    embeddings = np.empty((len(texts), missing_embeddings.shape[1]), np.float32)
+    embeddings[missing] = missing_embeddings
+    for i, embedding in enumerate(cached):
+        if embedding is not None:
+            embeddings[i] = embedding
+    return embeddings
+
+
+def create_embeddings(
+    texts: List[str],
+    *_,
+    **kwargs,
+) -> np.ndarray:
+    """Create embeddings for several texts with as few OpenAI API calls as possible
+
+    The chunks of all texts are sent together, up to EMBEDDING_BATCH_SIZE chunks per
+    request, and the chunk embeddings of each text are averaged weighted by chunk
+    length.
+
+    Args:
+        texts (List[str]): The texts to embed.
+        kwargs: Other arguments to pass to the OpenAI API embedding creation call.
+
+    Returns:
+        np.ndarray: The normalized embeddings, one row per text in the same order.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    chunks, chunk_owners = chunk_texts(texts)
+    chunk_embeddings = np.concatenate(
+        [
+            embed_chunks(list(batch), **kwargs)
+            for batch in batched(chunks, EMBEDDING_BATCH_SIZE)
+        ]
+    )
+    return average_chunk_embeddings(chunk_embeddings, chunks, chunk_owners, len(texts))
+
+
+def chunk_texts(texts: List[str]) -> Tuple[List[Sequence[int]], List[int]]:
+    """Split texts into token chunks that fit the embedding model
+
+    Args:
+        texts (List[str]): The texts to split.
+
+    Returns:
+        Tuple[List[Sequence[int]], List[int]]: The chunks of all texts, and the
+            index of the text each chunk belongs to.
+    """
+    cfg = Config()
+    chunks = []
+    chunk_owners = []
+    for i, text in enumerate(texts):
+        for chunk in chunked_tokens(
+            text,
+            tokenizer_name=cfg.embedding_tokenizer,
+            chunk_length=cfg.embedding_token_limit,
+        ):
+            chunks.append(chunk)
+            chunk_owners.append(i)
+    return chunks, chunk_owners
+
+
+def average_chunk_embeddings(
+    chunk_embeddings: np.ndarray,
+    chunks: List[Sequence[int]],
+    chunk_owners: List[int],
+    num_texts: int,
+) -> np.ndarray:
+    """Combine chunk embeddings into one normalized embedding per text, weighted by
+    chunk length
+
+    Args:
+        chunk_embeddings (np.ndarray): The chunk embeddings, one row per chunk.
+        chunks (List[Sequence[int]]): The token chunks.
+        chunk_owners (List[int]): The index of the text each chunk belongs to.
+        num_texts (int): The number of texts.
+
+    Returns:
+        np.ndarray: The embeddings, one row per text.
+    """
+    chunk_lengths = np.array([len(chunk) for chunk in chunks], dtype=np.float32)
+    text_embeddings = np.zeros((num_texts, chunk_embeddings.shape[1]), np.float32)
+    np.add.at(text_embeddings, chunk_owners, chunk_embeddings * chunk_lengths[:, None])
+    norms = np.linalg.norm(text_embeddings, axis=1, keepdims=True)
+    text_embeddings /= np.where(norms > 0, norms, 1)  # normalize the lengths to one
+    return text_embeddings
 
 
-@retry_openai_api()
 def create_embedding(
     text: str,
     *_,
     **kwargs,
-) -> openai.Embedding:
+) -> np.ndarray:
     """Create an embedding using the OpenAI API
 
     Args:
@@ -262,34 +445,51 @@ def create_embedding(
         kwargs: Other arguments to pass to the OpenAI API embedding creation call.
 
     Returns:
-        openai.Embedding: The embedding object.
+        np.ndarray: The normalized embedding.
+    """
+    return create_embeddings([text], **kwargs)[0]
+
+
+@retry_openai_api()
+def embed_chunks(chunks: List[Sequence[int]], **kwargs) -> np.ndarray:
+    """Embed a batch of token chunks with a single OpenAI API call
+
+    Args:
+        chunks (List[Sequence[int]]): The token chunks to embed.
+        kwargs: Other arguments to pass to the OpenAI API embedding creation call.
+
+    Returns:
+        np.ndarray: The chunk embeddings, one row per chunk in the same order.
     """
     cfg = Config()
-    chunk_embeddings = []
-    chunk_lengths = []
-    for chunk in chunked_tokens(
-        text,
-        tokenizer_name=cfg.embedding_tokenizer,
-        chunk_length=cfg.embedding_token_limit,
-    ):
-        embedding = openai.Embedding.create(
-            input=[chunk],
-            api_key=cfg.openai_api_key,
-            **kwargs,
-        )
-        api_manager = ApiManager()
-        api_manager.update_cost(
-            prompt_tokens=embedding.usage.prompt_tokens,
-            completion_tokens=0,
-            model=cfg.embedding_model,
-        )
-        chunk_embeddings.append(embedding["data"][0]["embedding"])
-        chunk_lengths.append(len(chunk))
-
-    # do weighted avg
-    chunk_embeddings = np.average(chunk_embeddings, axis=0, weights=chunk_lengths)
-    chunk_embeddings = chunk_embeddings / np.linalg.norm(
-        chunk_embeddings
-    )  # normalize the length to one
-    chunk_embeddings = chunk_embeddings.tolist()
-    return chunk_embeddings
+    RequestScheduler().acquire(cfg.embedding_model, sum(len(chunk) for chunk in chunks))
+    embedding = openai.Embedding.create(
+        input=chunks,
+        api_key=cfg.openai_api_key,
+        **kwargs,
+    )
+    return read_embedding_response(embedding)
+
+
+def read_embedding_response(embedding: openai.Embedding) -> np.ndarray:
+    """Update the cost with the usage of an embedding response and get its rows
+
+    Args:
+        embedding (openai.Embedding): The response of an embedding creation call.
+
+    Returns:
+        np.ndarray: The embeddings, one row per input in the same order.
+    """
+    api_manager = ApiManager()
+    api_manager.update_cost(
+        prompt_tokens=embedding.usage.prompt_tokens,
+        completion_tokens=0,
+        model=Config().embedding_model,
+    )
+    return np.array(
+        [
+            item["embedding"]
+            for item in sorted(embedding["data"], key=lambda x: x["index"])
+        ],
+        dtype=np.float32,
+    )
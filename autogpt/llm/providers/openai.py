@@ -1,4 +1,37 @@
-from autogpt.llm.base import ChatModelInfo, EmbeddingModelInfo
+"""Async OpenAI API calls sharing a pooled keep-alive HTTP session."""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Optional, TypeVar
+from weakref import WeakKeyDictionary
+
+import aiohttp
+import numpy as np
+import openai
+
+from autogpt.config import Config
+from autogpt.llm.api_manager import ApiManager
+from autogpt.llm.base import ChatModelInfo, EmbeddingModelInfo, Message
+from autogpt.llm.embedding_cache import EmbeddingCache
+from autogpt.llm.llm_utils import (
+    EMBEDDING_BATCH_SIZE,
+    average_chunk_embeddings,
+    batched,
+    chat_cache_key,
+    chunk_texts,
+    embedding_key,
+    handle_chat_completion,
+    on_chat_response,
+    read_embedding_response,
+)
+from autogpt.llm.response_cache import ResponseCache, response_key
+from autogpt.llm.retry import RetryPolicy
+from autogpt.llm.scheduler import Priority, RequestScheduler
+from autogpt.llm.single_flight import SingleFlight
+from autogpt.llm.token_counter import count_message_tokens
+
+T = TypeVar("T")
 
 OPEN_AI_CHAT_MODELS = {
     "gpt-3.5-turbo": ChatModelInfo(
@@ -35,3 +68,246 @@ OPEN_AI_MODELS = {
     **OPEN_AI_CHAT_MODELS,
     **OPEN_AI_EMBEDDING_MODELS,
 }
+
+
+class AsyncClient:
+    """A keep-alive HTTP session and a limit on concurrent requests.
+
+    aiohttp sessions are bound to an event loop, so there is one client per loop.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=max_concurrency)
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for a free request slot and route openai requests to the session."""
+        async with self.semaphore:
+            token = openai.aiosession.set(self.session)
+            try:
+                yield
+            finally:
+                openai.aiosession.reset(token)
+
+
+# event loop -> AsyncClient
+_clients: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def get_client() -> AsyncClient:
+    """Get the client of the running event loop, creating it if needed."""
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        _clients[loop] = AsyncClient(Config().openai_max_concurrency)
+    return _clients[loop]
+
+
+async def aclose() -> None:
+    """Close the HTTP session of the running event loop."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.session.close()
+
+
+def run_concurrently(coroutines: Iterable[Awaitable[T]]) -> List[T]:
+    """Run coroutines concurrently from synchronous code.
+
+    Args:
+        coroutines (Iterable[Awaitable[T]]): The coroutines to run.
+
+    Returns:
+        List[T]: Their results, in the same order.
+    """
+
+    async def gather() -> List[T]:
+        try:
+            return await asyncio.gather(*coroutines)
+        finally:
+            await aclose()
+
+    return asyncio.run(gather())
+
+
+async def request(
+    create: Callable[..., Awaitable[T]],
+    scheduled_model: Optional[str],
+    tokens: int,
+    priority: Priority,
+    **kwargs,
+) -> T:
+    """Make an API request in a free slot of the client once the scheduler admits
+    it, retrying failures
+
+    Args:
+        create (Callable[..., Awaitable[T]]): The async openai API call.
+        scheduled_model (str): The model to schedule the request for.
+        tokens (int): The estimated number of tokens of the request.
+        priority (Priority): The priority of the request.
+        kwargs: The arguments of the call.
+
+    Returns:
+        T: The response.
+    """
+
+    async def attempt() -> T:
+        await RequestScheduler().aacquire(scheduled_model, tokens, priority)
+        async with get_client().slot():
+            return await create(**kwargs)
+
+    return await RetryPolicy().acall(attempt)
+
+
+async def acreate_chat_completion(
+    messages: List[Message],
+    model: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    cache: Optional[bool] = None,
+    priority: Priority = Priority.NORMAL,
+) -> str:
+    """Create a chat completion without blocking the event loop
+
+    Plugins and the response cache are used like in create_chat_completion.
+
+    Args:
+        messages (List[Message]): The messages to send to the chat completion
+        model (str, optional): The model to use. Defaults to None.
+        temperature (float, optional): The temperature to use. Defaults to the
+            configured temperature.
+        max_tokens (int, optional): The max tokens to use. Defaults to None.
+        cache (bool, optional): Whether to use the response cache if CHAT_CACHE is
+            enabled. Defaults to None, which caches only temperature 0 requests.
+        priority (Priority, optional): The priority of the request if the model is
+            rate limited. Defaults to Priority.NORMAL.
+
+    Returns:
+        str: The response from the chat completion
+    """
+    cfg = Config()
+    if temperature is None:
+        temperature = cfg.temperature
+    message = handle_chat_completion(messages, model, temperature, max_tokens)
+    if message is not None:
+        return message
+    cache_key = chat_cache_key(messages, model, temperature, max_tokens, cache)
+    resp = ResponseCache().get(cache_key) if cache_key else None
+    if resp is not None:
+        return on_chat_response(resp)
+
+    kwargs = {}
+    if cfg.use_azure:
+        kwargs["deployment_id"] = cfg.get_azure_deployment_id_for_model(model)
+
+    tokens = 0
+    if RequestScheduler().schedules(model):
+        tokens = count_message_tokens(messages, model) + (max_tokens or 0)
+
+    async def complete() -> str:
+        response = await request(
+            openai.ChatCompletion.acreate,
+            model,
+            tokens,
+            priority,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=cfg.openai_api_key,
+            **kwargs,
+        )
+        ApiManager().update_cost(
+            response.usage.prompt_tokens, response.usage.completion_tokens, model
+        )
+        return response.choices[0].message["content"]
+
+    if temperature == 0:
+        key = "chat:" + response_key(messages, model, temperature, max_tokens)
+        resp = await SingleFlight().ado(key, complete)
+    else:
+        resp = await complete()
+    if cache_key:
+        ResponseCache().put(cache_key, resp)
+    return on_chat_response(resp)
+
+
+async def acreate_embeddings(texts: List[str]) -> np.ndarray:
+    """Embed several texts with the configured embedding model, sending the
+    batches of chunks concurrently. Cached embeddings are not requested again.
+
+    Args:
+        texts (List[str]): The texts to embed.
+
+    Returns:
+        np.ndarray: The normalized embeddings, one row per text in the same order.
+    """
+    cfg = Config()
+    model = cfg.embedding_model
+    if not texts:
+        dimensions = OPEN_AI_EMBEDDING_MODELS[model].embedding_dimensions
+        return np.empty((0, dimensions), dtype=np.float32)
+    texts = [text.replace("\n", " ") for text in texts]
+
+    if cfg.embedding_cache:
+        cached = EmbeddingCache().get_many(model, texts)
+    else:
+        cached = [None] * len(texts)
+    missing = [i for i, embedding in enumerate(cached) if embedding is None]
+    if not missing:
+        return np.array(cached, dtype=np.float32)
+
+    if cfg.use_azure:
+        kwargs = {"engine": cfg.get_azure_deployment_id_for_model(model)}
+    else:
+        kwargs = {"model": model}
+    missing_texts = [texts[i] for i in missing]
+
+    async def embed_batch(batch: List) -> np.ndarray:
+        response = await request(
+            openai.Embedding.acreate,
+            model,
+            sum(len(chunk) for chunk in batch),
+            Priority.NORMAL,
+            input=batch,
+            api_key=cfg.openai_api_key,
+            **kwargs,
+        )
+        return read_embedding_response(response)
+
+    async def embed(own: List[int]) -> np.ndarray:
+        own_texts = [missing_texts[i] for i in own]
+        chunks, chunk_owners = chunk_texts(own_texts)
+        batches = [list(batch) for batch in batched(chunks, EMBEDDING_BATCH_SIZE)]
+        chunk_embeddings = await asyncio.gather(*[embed_batch(b) for b in batches])
+        embeddings = average_chunk_embeddings(
+            np.concatenate(chunk_embeddings), chunks, chunk_owners, len(own_texts)
+        )
+        if cfg.embedding_cache:
+            EmbeddingCache().put_many(model, own_texts, embeddings)
+        return embeddings
+
+    keys = [embedding_key(model, text) for text in missing_texts]
+    missing_embeddings = np.stack(await SingleFlight().ado_many(keys, embed))
+    if len(missing) == len(texts):
+        return missing_embeddings
+
+    embeddings = np.empty((len(texts), missing_embeddings.shape[1]), np.float32)
+    embeddings[missing] = missing_embeddings
+    for i, embedding in enumerate(cached):
+        if embedding is not None:
+            embeddings[i] = embedding
+    return embeddings
+
+
+async def acreate_embedding(text: str) -> np.ndarray:
+    """Embed a text with the configured embedding model
+
+    Args:
+        text (str): The text to embed.
+
+    Returns:
+        np.ndarray: The normalized embedding.
+    """
+    return (await acreate_embeddings([text]))[0]
@@ -0,0 +1,109 @@
+"""Disk-backed cache for deterministic chat completion responses."""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from autogpt.config import Config
+from autogpt.llm.base import Message
+from autogpt.llm.sqlite_cache import SQLiteCache
+from autogpt.logs import logger
+from autogpt.singleton import Singleton
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def response_key(
+    messages: List[Message],
+    model: Optional[str],
+    temperature: float,
+    max_tokens: Optional[int],
+) -> str:
+    """Get the cache key of a chat completion request.
+
+    Surrounding whitespace of the message contents is ignored, so requests that
+    only differ in it share a key.
+    """
+    request = {
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "messages": [
+            {"role": message["role"], "content": message["content"].strip()}
+            for message in messages
+        ],
+    }
+    return hashlib.sha256(
+        json.dumps(request, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class ResponseCache(SQLiteCache, metaclass=Singleton):
+    """SQLite cache of chat completion responses.
+
+    Responses older than `ttl` seconds are not returned anymore, and once the
+    cache holds more than `max_entries` responses, the least recently used ones
+    are evicted.
+    """
+
+    schema = SCHEMA
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        ttl: float | None = None,
+        max_entries: int | None = None,
+    ) -> None:
+        cfg = Config()
+        super().__init__(
+            path or cfg.chat_cache_path, max_entries or cfg.chat_cache_max_entries
+        )
+        self.ttl = ttl if ttl is not None else cfg.chat_cache_ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up the response to a request by its `response_key`, None if it
+        is missing or expired."""
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+                )
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.debug(
+            f"Chat completion cache hit ({self.hits} hits, {self.misses} misses)"
+        )
+        return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """Store the response to a request by its `response_key`, evicting expired
+        and least recently used responses if the cache got too big."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self.connection.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+            )
+            self.evict("responses")
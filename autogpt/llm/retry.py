@@ -0,0 +1,246 @@
+"""Retry policy for OpenAI API calls, shared by all threads of the process."""
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Mapping, Optional, TypeVar
+
+from colorama import Fore, Style
+from openai.error import APIError, RateLimitError, ServiceUnavailableError, Timeout
+
+from autogpt.config import Config
+from autogpt.logs import logger
+
+T = TypeVar("T")
+
+# HTTP statuses of APIError and Timeout that are worth retrying
+RETRYABLE_STATUSES = {502, 503}
+# headers that tell how long to wait before the next request
+RESET_HEADERS = ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+RETRY_LIMIT_MSG = f"{Fore.RED}Error: Reached rate limit, passing...{Fore.RESET}"
+API_KEY_ERROR_MSG = (
+    f"Please double check that you have setup a "
+    f"{Fore.CYAN + Style.BRIGHT}PAID{Style.RESET_ALL} OpenAI API Account. You can "
+    f"read more here: {Fore.CYAN}https://docs.agpt.co/setup/#getting-an-api-key{Fore.RESET}"
+)
+BACKOFF_MSG = (
+    f"{Fore.RED}Error: API Bad gateway. Waiting {{backoff:.2f}} seconds...{Fore.RESET}"
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when the API keeps failing and the wait would exceed the budget."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed API call may succeed if it is retried."""
+    if isinstance(error, (RateLimitError, ServiceUnavailableError)):
+        return True
+    if isinstance(error, (APIError, Timeout)):
+        return error.http_status in RETRYABLE_STATUSES
+    return False
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse a wait from a header, e.g. `20`, `1.5s`, `6m0s` or an HTTP date."""
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if parts:
+        return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def header_wait(error: Exception) -> Optional[float]:
+    """Get the wait the server asked for, if any.
+
+    Args:
+        error (Exception): The error of the failed call.
+
+    Returns:
+        Optional[float]: The seconds to wait, or None if the server did not say.
+    """
+    headers: Mapping = getattr(error, "headers", None) or {}
+    headers = {key.lower(): value for key, value in headers.items()}
+    waits = [
+        parse_duration(str(headers[name]))
+        for name in ("retry-after", *RESET_HEADERS)
+        if name in headers
+    ]
+    waits = [wait for wait in waits if wait is not None]
+    return max(waits) if waits else None
+
+
+class CircuitBreaker:
+    """Pauses all callers while the API is failing.
+
+    Every retryable failure makes all threads wait at least as long as the
+    failed call's backoff. After `threshold` consecutive failures the circuit
+    opens for `cooldown` seconds. A successful call closes it again.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.blocked_until = 0.0
+
+    def wait_time(self) -> float:
+        """Seconds until calls may be made again."""
+        with self.lock:
+            return max(self.blocked_until - time.time(), 0.0)
+
+    def record_failure(self, wait: float) -> None:
+        """Block calls for `wait` seconds, or open the circuit if it is tripped."""
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                wait = max(wait, self.cooldown)
+                logger.debug(
+                    f"{self.failures} API calls failed in a row, pausing all calls "
+                    f"for {wait:.1f} seconds"
+                )
+            self.blocked_until = max(self.blocked_until, time.time() + wait)
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        with self.lock:
+            self.failures = 0
+
+    def reset(self) -> None:
+        """Forget all failures and unblock calls."""
+        with self.lock:
+            self.failures = 0
+            self.blocked_until = 0.0
+
+
+circuit_breaker = CircuitBreaker()
+
+
+class RetryPolicy:
+    """Retries failed OpenAI API calls with decorrelated jitter.
+
+    The server's Retry-After and rate-limit reset headers take precedence over
+    the jittered backoff. No call waits more than `max_total_wait` seconds in
+    total, and waits are shared with other threads through the circuit breaker.
+    """
+
+    def __init__(
+        self,
+        num_retries: int = 10,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        max_total_wait: float | None = None,
+        warn_user: bool = True,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.num_retries = num_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_total_wait = (
+            max_total_wait
+            if max_total_wait is not None
+            else Config().openai_retry_max_wait
+        )
+        self.warn_user = warn_user
+        self.breaker = breaker or circuit_breaker
+
+    def next_delay(self, previous: float) -> float:
+        """Get the next decorrelated jitter backoff."""
+        return min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Call a function and retry it until it succeeds or the budget is spent."""
+        state = RetryState(self)
+        while True:
+            state.wait(time.sleep)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                state.failed(e)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Await a coroutine function and retry it like `call`."""
+        state = RetryState(self)
+        while True:
+            await state.await_wait()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                state.failed(e)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+class RetryState:
+    """The retry state of a single call."""
+
+    def __init__(self, policy: RetryPolicy) -> None:
+        self.policy = policy
+        self.retries = 0
+        self.waited = 0.0
+        self.delay = policy.base_delay
+        self.user_warned = not policy.warn_user
+        self.error: Exception | None = None
+
+    def next_wait(self) -> float:
+        """Get the wait before the next attempt, or raise if over the budget."""
+        wait = self.policy.breaker.wait_time()
+        if self.waited + wait > self.policy.max_total_wait:
+            if self.error is not None:
+                raise self.error
+            raise CircuitOpenError(
+                f"The OpenAI API is paused for another {wait:.0f} seconds"
+            )
+        self.waited += wait
+        return wait
+
+    def wait(self, sleep: Callable[[float], None]) -> None:
+        """Sleep until the next attempt may be made."""
+        wait = self.next_wait()
+        if wait > 0:
+            sleep(wait)
+
+    async def await_wait(self) -> None:
+        """Sleep without blocking the event loop until the next attempt."""
+        wait = self.next_wait()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def failed(self, error: Exception) -> None:
+        """Record a failed attempt, re-raising the error if it is final."""
+        if not is_retryable(error) or self.retries >= self.policy.num_retries:
+            raise error
+        self.retries += 1
+        self.error = error
+
+        self.delay = self.policy.next_delay(self.delay)
+        wait = header_wait(error)
+        if wait is None:
+            wait = self.delay
+        if isinstance(error, RateLimitError):
+            logger.debug(RETRY_LIMIT_MSG)
+            if not self.user_warned:
+                logger.double_check(API_KEY_ERROR_MSG)
+                self.user_warned = True
+        else:
+            logger.debug(BACKOFF_MSG.format(backoff=wait))
+        self.policy.breaker.record_failure(wait)
@@ -0,0 +1,167 @@
+"""Client-side scheduling of OpenAI API requests within rate limits."""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+from autogpt.config import Config
+from autogpt.logs import logger
+from autogpt.singleton import Singleton
+
+# How often waiting requests check whether they may be admitted, in seconds
+POLL_INTERVAL = 0.05
+
+
+class Priority(IntEnum):
+    """Priority of an API request, lower values are admitted first."""
+
+    HIGH = 0  # the agent's own reply
+    NORMAL = 1
+    LOW = 2  # background work like summarization
+
+
+class TokenBucket:
+    """A bucket that holds up to `capacity` units and refills it every minute."""
+
+    def __init__(self, capacity: float) -> None:
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(
+            self.capacity,
+            self.level + (now - self.updated) * self.capacity / 60,
+        )
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` units are available."""
+        missing = min(amount, self.capacity) - self.level
+        return max(missing, 0) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+
+class ModelLimiter:
+    """Requests-per-minute and tokens-per-minute buckets of a model, and the
+    requests waiting for them ordered by priority."""
+
+    def __init__(self, rpm: int, tpm: int) -> None:
+        self.buckets: List[Tuple[TokenBucket, bool]] = []
+        if rpm:
+            self.buckets.append((TokenBucket(rpm), False))
+        if tpm:
+            self.buckets.append((TokenBucket(tpm), True))
+        # (priority, sequence number, tokens)
+        self.waiting: List[Tuple[int, int, int]] = []
+
+    def try_admit(self, ticket: Tuple[int, int, int]) -> float:
+        """Admit a waiting request if it is next in line and fits the buckets.
+
+        Returns:
+            float: 0 if the request was admitted, else the seconds to wait.
+        """
+        now = time.monotonic()
+        for bucket, _ in self.buckets:
+            bucket.refill(now)
+        if self.waiting[0] != ticket:
+            return POLL_INTERVAL
+        tokens = ticket[2]
+        wait = max(
+            bucket.time_until(tokens if counts_tokens else 1)
+            for bucket, counts_tokens in self.buckets
+        )
+        if wait > 0:
+            return wait
+        for bucket, counts_tokens in self.buckets:
+            bucket.take(tokens if counts_tokens else 1)
+        heapq.heappop(self.waiting)
+        return 0
+
+
+class RequestScheduler(metaclass=Singleton):
+    """Admits API requests per model within the configured RPM and TPM limits.
+
+    Requests wait in line by priority, so background work never delays the
+    agent's own requests. Models without configured limits are not scheduled.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, int]]] = None) -> None:
+        if limits is None:
+            limits = Config().openai_rate_limits
+        self.limiters = {
+            model: ModelLimiter(rpm, tpm) for model, (rpm, tpm) in limits.items()
+        }
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+
+    def schedules(self, model: Optional[str]) -> bool:
+        """Whether requests to a model are rate limited."""
+        return model in self.limiters
+
+    def _enqueue(
+        self, model: Optional[str], tokens: int, priority: Priority
+    ) -> Tuple[Optional[ModelLimiter], Tuple[int, int, int]]:
+        limiter = self.limiters.get(model)
+        ticket = (int(priority), next(self.sequence), tokens)
+        if limiter is not None:
+            heapq.heappush(limiter.waiting, ticket)
+        return limiter, ticket
+
+    def _dequeue(self, limiter: ModelLimiter, ticket: Tuple[int, int, int]) -> None:
+        if ticket in limiter.waiting:
+            limiter.waiting.remove(ticket)
+            heapq.heapify(limiter.waiting)
+        self.condition.notify_all()
+
+    def acquire(
+        self, model: Optional[str], tokens: int, priority: Priority = Priority.NORMAL
+    ) -> None:
+        """
+        Block until a request may be sent.
+
+        Args:
+        model (str): The model of the request.
+        tokens (int): The estimated number of tokens of the request.
+        priority (Priority): The priority of the request.
+        """
+        with self.condition:
+            limiter, ticket = self._enqueue(model, tokens, priority)
+            if limiter is None:
+                return
+            try:
+                waited = False
+                while wait := limiter.try_admit(ticket):
+                    waited = True
+                    self.condition.wait(wait)
+                if waited:
+                    logger.debug(f"Admitted {model} request of {tokens} tokens")
+            finally:
+                self._dequeue(limiter, ticket)
+
+    async def aacquire(
+        self, model: Optional[str], tokens: int, priority: Priority = Priority.NORMAL
+    ) -> None:
+        """Wait without blocking the event loop until a request may be sent, see
+        `acquire`."""
+        with self.condition:
+            limiter, ticket = self._enqueue(model, tokens, priority)
+        if limiter is None:
+            return
+        try:
+            while True:
+                with self.condition:
+                    wait = limiter.try_admit(ticket)
+                if not wait:
+                    break
+                await asyncio.sleep(min(wait, POLL_INTERVAL))
+        finally:
+            with self.condition:
+                self._dequeue(limiter, ticket)
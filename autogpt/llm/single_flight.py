@@ -0,0 +1,109 @@
+"""Deduplication of identical API requests that are in flight at the same time."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple, TypeVar
+
+from autogpt.logs import logger
+from autogpt.singleton import Singleton
+
+T = TypeVar("T")
+
+
+class SingleFlight(metaclass=Singleton):
+    """Shares the results of in-flight requests with identical concurrent requests.
+
+    Each request is identified by a key, e.g. a hash of the model and input. The
+    first caller for a key makes the request; callers that ask for the same key
+    before it finishes wait for its result instead of making their own.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.calls: Dict[str, Future] = {}
+
+    def _claim(self, keys: List[str]) -> Tuple[List[Future], List[int]]:
+        """Get the futures of the keys, and the indices of the keys this caller
+        has to request itself."""
+        futures = []
+        own = []
+        with self.lock:
+            for i, key in enumerate(keys):
+                future = self.calls.get(key)
+                if future is None:
+                    future = self.calls[key] = Future()
+                    own.append(i)
+                futures.append(future)
+        shared = len(keys) - len(own)
+        if shared:
+            logger.debug(f"Waiting for {shared} identical requests in flight")
+        return futures, own
+
+    def _settle(
+        self,
+        keys: List[str],
+        futures: List[Future],
+        own: List[int],
+        results: Sequence | None,
+        error: BaseException | None,
+    ) -> None:
+        with self.lock:
+            for i in own:
+                del self.calls[keys[i]]
+        for n, i in enumerate(own):
+            if error is not None:
+                futures[i].set_exception(error)
+            else:
+                futures[i].set_result(results[n])
+
+    def do_many(
+        self, keys: List[str], func: Callable[[List[int]], Sequence[T]]
+    ) -> List[T]:
+        """
+        Get the results of several requests, sharing them with concurrent callers.
+
+        Args:
+        keys (List[str]): The keys of the requests.
+        func (Callable[[List[int]], Sequence[T]]): Makes the requests with the
+            given indices and returns their results in the same order.
+
+        Returns:
+        List[T]: The results, in the same order as the keys.
+        """
+        futures, own = self._claim(keys)
+        if own:
+            try:
+                results = func(own)
+            except BaseException as e:
+                self._settle(keys, futures, own, None, e)
+                raise
+            self._settle(keys, futures, own, results, None)
+        return [future.result() for future in futures]
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        """Get the result of a request, sharing it with concurrent callers."""
+        return self.do_many([key], lambda _: [func()])[0]
+
+    async def ado_many(
+        self, keys: List[str], func: Callable[[List[int]], Awaitable[Sequence[T]]]
+    ) -> List[T]:
+        """Await the results of several requests like `do_many`."""
+        futures, own = self._claim(keys)
+        if own:
+            try:
+                results = await func(own)
+            except BaseException as e:
+                self._settle(keys, futures, own, None, e)
+                raise
+            self._settle(keys, futures, own, results, None)
+        return [await asyncio.wrap_future(future) for future in futures]
+
+    async def ado(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Await the result of a request like `do`."""
+
+        async def call(_: List[int]) -> List[T]:
+            return [await func()]
+
+        return (await self.ado_many([key], call))[0]
@@ -0,0 +1,43 @@
+"""Base class of the disk caches backed by SQLite."""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SQLiteCache:
+    """Base of the disk caches: a SQLite database in WAL mode shared by all
+    threads, least recently used eviction and hit counters.
+
+    Subclasses set `schema`; every table needs a `last_used` column.
+    """
+
+    schema = ""
+
+    def __init__(self, path: str | Path, max_entries: int) -> None:
+        self.path = Path(path).expanduser()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(self.schema)
+
+    def evict(self, table: str) -> None:
+        """Delete the least recently used rows of a table above `max_entries`.
+        Must be called with the lock held."""
+        self.connection.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table}"
+            f" ORDER BY last_used LIMIT max(0, (SELECT COUNT(*) FROM {table}) - ?))",
+            (self.max_entries,),
+        )
+
+    def get_stats(self) -> dict:
+        """Get the hit and miss counters of this process."""
+        return {"hits": self.hits, "misses": self.misses}
@@ -1,13 +1,102 @@
 """Functions for counting the number of tokens in a message or string."""
 from __future__ import annotations
 
-from typing import List
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 import tiktoken
 
 from autogpt.llm.base import Message
 from autogpt.logs import logger
 
+# model alias -> the model snapshot its message format is counted for
+MODEL_ALIASES = {
+    # !Note: gpt-3.5-turbo and gpt-4 may change over time.
+    "gpt-3.5-turbo": "gpt-3.5-turbo-0301",
+    "gpt-4": "gpt-4-0314",
+}
+# model -> (tokens per message, tokens per name)
+MESSAGE_FORMATS = {
+    # every message follows <|start|>{role/name}\n{content}<|end|>\n
+    # if there's a name, the role is omitted
+    "gpt-3.5-turbo-0301": (4, -1),
+    "gpt-4-0314": (3, 1),
+}
+# Number of distinct texts whose token counts are remembered
+TOKEN_COUNT_CACHE_SIZE = 4096
+
+# (digest of the text, encoding name) -> token count, least recently used first
+_token_counts: OrderedDict[Tuple[bytes, str], int] = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """
+    Returns the encoding of a model, loading it only once.
+
+    Args:
+        model (str): The name of the model.
+
+    Returns:
+        tiktoken.Encoding: The encoding, cl100k_base for unknown models.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        logger.warn("Warning: model not found. Using cl100k_base encoding.")
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_text_tokens(text: str, encoding_name: str) -> int:
+    """
+    Returns the number of tokens in a text, remembering the counts of recently
+    counted texts so that the message history is not re-encoded every cycle.
+
+    The counts are keyed by a digest of the text, so the cache does not keep
+    long texts in memory.
+
+    Args:
+        text (str): The text.
+        encoding_name (str): The name of the encoding, e.g. "cl100k_base".
+
+    Returns:
+        int: The number of tokens in the text.
+    """
+    key = (hashlib.sha256(text.encode("utf-8")).digest(), encoding_name)
+    with _token_counts_lock:
+        if key in _token_counts:
+            _token_counts.move_to_end(key)
+            return _token_counts[key]
+    count = len(tiktoken.get_encoding(encoding_name).encode(text))
+    with _token_counts_lock:
+        _token_counts[key] = count
+        if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def clear_token_counts() -> None:
+    """Forget the remembered token counts."""
+    with _token_counts_lock:
+        _token_counts.clear()
+
+
+def get_message_format(model: str) -> Tuple[int, int]:
+    """Returns the tokens per message and per name of a model's chat format."""
+    model = MODEL_ALIASES.get(model, model)
+    if model not in MESSAGE_FORMATS:
+        raise NotImplementedError(
+            f"num_tokens_from_messages() is not implemented for model {model}.\n"
+            " See https://github.com/openai/openai-python/blob/main/chatml.md for"
+            " information on how messages are converted to tokens."
+        )
+    return MESSAGE_FORMATS[model]
+
 
 def count_message_tokens(
     messages: List[Message], model: str = "gpt-3.5-turbo-0301"
@@ -24,53 +113,86 @@ def count_message_tokens(
     Returns:
         int: The number of tokens used by the list of messages.
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        logger.warn("Warning: model not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
-    if model == "gpt-3.5-turbo":
-        # !Note: gpt-3.5-turbo may change over time.
-        # Returning num tokens assuming gpt-3.5-turbo-0301.")
-        return count_message_tokens(messages, model="gpt-3.5-turbo-0301")
-    elif model == "gpt-4":
-        # !Note: gpt-4 may change over time. Returning num tokens assuming gpt-4-0314.")
-        return count_message_tokens(messages, model="gpt-4-0314")
-    elif model == "gpt-3.5-turbo-0301":
-        tokens_per_message = (
-            4  # every message follows <|start|>{role/name}\n{content}<|end|>\n
-        )
-        tokens_per_name = -1  # if there's a name, the role is omitted
-    elif model == "gpt-4-0314":
-        tokens_per_message = 3
-        tokens_per_name = 1
-    else:
-        raise NotImplementedError(
-            f"num_tokens_from_messages() is not implemented for model {model}.\n"
-            " See https://github.com/openai/openai-python/blob/main/chatml.md for"
-            " information on how messages are converted to tokens."
-        )
+    tokens_per_message, tokens_per_name = get_message_format(model)
+    encoding = get_encoding(model)
     num_tokens = 0
     for message in messages:
         num_tokens += tokens_per_message
         for key, value in message.items():
-            num_tokens += len(encoding.encode(value))
+            num_tokens += count_text_tokens(value, encoding.name)
             if key == "name":
                 num_tokens += tokens_per_name
     num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
     return num_tokens
 
 
-def count_string_tokens(string: str, model_name: str) -> int:
+def count_string_tokens(
+    string: str, model_name: str, limit: Optional[int] = None
+) -> int:
     """
     Returns the number of tokens in a text string.
 
     Args:
         string (str): The text string.
         model_name (str): The name of the encoding to use. (e.g., "gpt-3.5-turbo")
+        limit (int, optional): A token budget. Once a prefix of the string is
+            known to exceed it, the prefix's count is returned without encoding
+            the rest. Defaults to None.
 
     Returns:
-        int: The number of tokens in the text string.
+        int: The number of tokens in the text string, or a number greater than
+            `limit` if the string exceeds it.
+    """
+    encoding = get_encoding(model_name)
+    if limit is not None:
+        # Start with a prefix of roughly `limit` tokens and double it. Cutting
+        # between words keeps the prefix's tokens a subset of the string's.
+        end = (limit + 1) * 4
+        while end < len(string):
+            cut = string.rfind(" ", 0, end)
+            prefix_tokens = len(encoding.encode(string[: cut if cut > 0 else end]))
+            if prefix_tokens > limit:
+                return prefix_tokens
+            end *= 2
+    return count_text_tokens(string, encoding.name)
+
+
+class TokenLedger:
+    """Token counts of an append-only message history and their running sums.
+
+    Every message is counted once, when the ledger first sees it, so choosing the
+    messages that fit in the context window does not re-count the history.
     """
-    encoding = tiktoken.encoding_for_model(model_name)
-    return len(encoding.encode(string))
+
+    def __init__(self) -> None:
+        self.model: Optional[str] = None
+        # sums[i] is the number of tokens of the first i messages
+        self.sums = [0]
+
+    def update(self, messages: List[Message], model: str) -> None:
+        """Count the messages appended since the last update."""
+        if model != self.model or len(messages) < len(self.sums) - 1:
+            self.model = model
+            self.sums = [0]
+        for message in messages[len(self.sums) - 1 :]:
+            self.sums.append(self.sums[-1] + count_message_tokens([message], model))
+
+    def select_window(
+        self, messages: List[Message], model: str, budget: int
+    ) -> Tuple[int, int]:
+        """
+        Find the most recent messages that fit in a token budget.
+
+        Args:
+            messages (List[Message]): The message history.
+            model (str): The model to count tokens for.
+            budget (int): The number of tokens available for the messages.
+
+        Returns:
+            Tuple[int, int]: The index of the first message in the window, and the
+                number of tokens of the window.
+        """
+        self.update(messages, model)
+        total = self.sums[-1]
+        start = min(bisect.bisect_left(self.sums, total - budget), len(messages))
+        return start, total - self.sums[start]
@@ -76,7 +76,7 @@ def get_memory(cfg, init=False):
 
     if memory is None:
         memory = LocalCache(cfg)
-        if init:
+        if init and not cfg.local_cache_persist:
             memory.clear()
     return memory
 
@@ -10,6 +10,14 @@ class MemoryProviderSingleton(AbstractSingleton):
         """Adds to memory"""
         pass
 
+    def add_many(self, data, embeddings=None):
+        """Adds several items to memory
+
+        Providers that can embed and write a batch in one go should override this,
+        and store the precomputed `embeddings` of the items if they are given.
+        """
+        return [self.add(item) for item in data]
+
     @abc.abstractmethod
     def get(self, data):
         """Gets from memory"""
@@ -1,33 +1,531 @@
 from __future__ import annotations
 
 import dataclasses
+import itertools
+import os
+import struct
+from collections.abc import Sequence
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, List
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple
 
 import numpy as np
-import orjson
 
-from autogpt.llm import get_ada_embedding
+try:
+    import fcntl
+except ImportError:
+    # Windows has no advisory file locks, so the files are not locked there
+    fcntl = None
+
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
 from autogpt.memory.base import MemoryProviderSingleton
 
 EMBED_DIM = 1536
-SAVE_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SERIALIZE_DATACLASS
+VECTOR_SIZE = EMBED_DIM * np.dtype(np.float32).itemsize
+# Every record in the texts log is prefixed with its length in bytes
+TEXT_LENGTH = struct.Struct("<I")
+OFFSET_DTYPE = np.dtype("<i8")
+# Rows needed per IVF list before the index gets trained
+TRAIN_ROWS_PER_LIST = 16
+# Rows sampled per IVF list to compute the centroids
+MAX_TRAIN_ROWS_PER_LIST = 64
+# Rows converted to float32 at once when scoring or clustering
+BLOCK_SIZE = 65536
+
+
+def create_default_embeddings(dtype: str | np.dtype = np.float32):
+    return np.zeros((0, EMBED_DIM)).astype(dtype)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the `k` highest scores along the last axis, best first.
+
+    Uses a partial sort, so only the `k` winners get sorted.
+    """
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.zeros(scores.shape[:-1] + (0,), dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1)
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+class TextLog(Sequence):
+    """Read-only view of the texts stored in a texts log.
+
+    Texts are decoded from the memory-mapped log when they are accessed, so opening
+    a large log costs nothing until its texts are actually needed. Texts added
+    after the log was opened are kept in memory.
+    """
+
+    def __init__(self, path: Path, offsets: np.ndarray) -> None:
+        self.offsets = offsets
+        self.log = np.memmap(path, dtype=np.uint8, mode="r") if len(offsets) else None
+        self.added: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.offsets) + len(self.added)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("text index out of range")
+        if index >= len(self.offsets):
+            return self.added[index - len(self.offsets)]
+
+        start = int(self.offsets[index - 1]) if index else 0
+        end = int(self.offsets[index])
+        return bytes(self.log[start + TEXT_LENGTH.size : end]).decode("utf-8")
 
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
 
-def create_default_embeddings():
-    return np.zeros((0, EMBED_DIM)).astype(np.float32)
+    def extend(self, texts: Iterable[str]) -> None:
+        self.added.extend(texts)
 
 
 @dataclasses.dataclass
 class CacheContent:
-    texts: List[str] = dataclasses.field(default_factory=list)
-    embeddings: np.ndarray = dataclasses.field(
-        default_factory=create_default_embeddings
-    )
+    """Texts and their embeddings.
+
+    The embeddings live in a preallocated buffer whose capacity doubles when it runs
+    out of room, so appending a row costs amortized O(1) instead of copying the
+    whole matrix. Only the first `size` rows of the buffer hold data.
+
+    The buffer is float32 by default. It can also be float16, or int8 with a scale
+    per row in `scales`, to cut its size at the cost of approximate scores.
+    """
+
+    texts: List[str] | TextLog = dataclasses.field(default_factory=list)
+    buffer: np.ndarray = dataclasses.field(default_factory=create_default_embeddings)
+    size: int = 0
+    scales: np.ndarray | None = None
+
+    def __post_init__(self) -> None:
+        if self.buffer.dtype == np.int8 and self.scales is None:
+            self.scales = np.ones(len(self.buffer), dtype=np.float32)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """The filled rows of the embeddings buffer."""
+        return self.buffer[: self.size]
+
+    @property
+    def exact(self) -> bool:
+        """Whether the embeddings are stored in full precision."""
+        return self.buffer.dtype == np.float32
+
+    def reserve(self, capacity: int) -> None:
+        """Grow the buffer so it can hold at least `capacity` rows."""
+        if capacity <= len(self.buffer):
+            return
+        new_capacity = max(capacity, 2 * len(self.buffer), 1)
+        buffer = np.empty((new_capacity, EMBED_DIM), dtype=self.buffer.dtype)
+        buffer[: self.size] = self.buffer[: self.size]
+        self.buffer = buffer
+        if self.scales is not None:
+            scales = np.ones(new_capacity, dtype=np.float32)
+            scales[: self.size] = self.scales[: self.size]
+            self.scales = scales
+
+    def append(self, texts: List[str], vectors: np.ndarray) -> None:
+        """Append texts and their embeddings, one row per text."""
+        self.append_vectors(vectors)
+        self.texts.extend(texts)
+
+    def append_vectors(self, vectors: np.ndarray) -> None:
+        """Append embeddings, quantizing them to the dtype of the buffer."""
+        self.reserve(self.size + len(vectors))
+        rows = slice(self.size, self.size + len(vectors))
+        if self.scales is not None:
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1
+            self.buffer[rows] = np.rint(vectors / scales[:, np.newaxis])
+            self.scales[rows] = scales
+        else:
+            self.buffer[rows] = vectors
+        self.size += len(vectors)
+
+    def decode(self, rows: slice | np.ndarray) -> np.ndarray:
+        """Return the selected embeddings as float32."""
+        vectors = self.buffer[rows].astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows][:, np.newaxis]
+        return vectors
+
+    def score(self, queries: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Score every query against the selected rows, or all rows if none are given.
+
+        Quantized rows are scored in blocks, so only one block at a time gets
+        converted to float32.
+        """
+        if rows is not None:
+            return self.score_block(queries, rows)
+        if self.exact:
+            return queries @ self.embeddings.T
+        return np.concatenate(
+            [np.zeros((len(queries), 0), dtype=np.float32)]
+            + [
+                self.score_block(
+                    queries, slice(start, min(start + BLOCK_SIZE, self.size))
+                )
+                for start in range(0, self.size, BLOCK_SIZE)
+            ],
+            axis=1,
+        )
+
+    def score_block(self, queries: np.ndarray, rows: slice | np.ndarray) -> np.ndarray:
+        scores = queries @ self.buffer[rows].astype(np.float32, copy=False).T
+        if self.scales is not None:
+            scores *= self.scales[rows]
+        return scores
+
+
+class CacheFiles:
+    """Append-only files backing a LocalCache.
+
+    Embeddings are stored as raw float32 rows in `{name}.vectors` and texts as
+    length-prefixed UTF-8 records in `{name}.texts`, so adding an entry only writes
+    that entry's bytes. `{name}.offsets` holds the end offset of every text record,
+    which lets the texts be located without scanning the log. Writes are flushed to
+    the OS immediately and fsynced once every `sync_interval` entries.
+
+    Appends, truncation and compaction hold an exclusive lock on `{name}.lock`,
+    so a process opening the files never cuts an entry another one is writing.
+    """
+
+    def __init__(self, directory: Path, name: str, sync_interval: int = 1) -> None:
+        self.vectors_path = directory / f"{name}.vectors"
+        self.texts_path = directory / f"{name}.texts"
+        self.offsets_path = directory / f"{name}.offsets"
+        self.sync_interval = max(sync_interval, 1)
+        self.unsynced = 0
+        self.vectors_file: BinaryIO = self.vectors_path.open("ab")
+        self.texts_file: BinaryIO = self.texts_path.open("ab")
+        self.offsets_file: BinaryIO = self.offsets_path.open("ab")
+        self.lock_file: BinaryIO = (directory / f"{name}.lock").open("ab")
+        self.texts_size = self.texts_path.stat().st_size
+        self.vectors: np.memmap | None = None
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the lock of the files, shared with other processes using them."""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+
+    def append(self, texts: List[str], vectors: np.ndarray) -> None:
+        """Append entries to the end of the files.
+
+        The vectors are written first and the offsets last, so a complete offset
+        always has a complete text and vector behind it.
+        """
+        records = [
+            TEXT_LENGTH.pack(len(encoded)) + encoded
+            for encoded in (text.encode("utf-8") for text in texts)
+        ]
+        with self.locked():
+            # other processes may have appended since the last write
+            self.texts_size = os.fstat(self.texts_file.fileno()).st_size
+            self.vectors_file.write(np.ascontiguousarray(vectors, np.float32).tobytes())
+            self.vectors_file.flush()
+
+            self.texts_file.write(b"".join(records))
+            self.texts_file.flush()
+
+            ends = self.texts_size + np.cumsum([len(record) for record in records])
+            self.offsets_file.write(ends.astype(OFFSET_DTYPE).tobytes())
+            self.offsets_file.flush()
+            if len(ends):
+                self.texts_size = int(ends[-1])
+
+        self.unsynced += len(texts)
+        if self.unsynced >= self.sync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        """Force the written entries to disk."""
+        for file in (self.vectors_file, self.texts_file, self.offsets_file):
+            os.fsync(file.fileno())
+        self.unsynced = 0
+
+    def truncate(self) -> None:
+        """Remove all entries."""
+        self.vectors = None
+        with self.locked():
+            for file in (self.vectors_file, self.texts_file, self.offsets_file):
+                file.truncate(0)
+            self.texts_size = 0
+            self.sync()
+
+    def compact(self) -> int:
+        """Drop any partially written entry left behind by an interrupted write.
+
+        The offsets are rebuilt from the texts log if they are missing or do not
+        match it.
+
+        Returns:
+            int: The number of complete entries left in the files.
+        """
+        with self.locked():
+            self.texts_size = self.texts_path.stat().st_size
+            return self._compact()
+
+    def _compact(self) -> int:
+        offsets = self.read_offsets()
+        count = int(np.searchsorted(offsets, self.texts_size, side="right"))
+        if not self.offsets_match(offsets, count):
+            offsets = read_text_offsets(self.texts_path)
+            count = len(offsets)
+            self.offsets_file.truncate(0)
+            self.offsets_file.write(offsets.tobytes())
+        count = min(count, self.vectors_path.stat().st_size // VECTOR_SIZE)
+        self.texts_size = int(offsets[count - 1]) if count else 0
+        del offsets
+        self.vectors = None
+
+        self.vectors_file.truncate(count * VECTOR_SIZE)
+        self.texts_file.truncate(self.texts_size)
+        self.offsets_file.truncate(count * OFFSET_DTYPE.itemsize)
+        self.sync()
+        return count
+
+    def offsets_match(self, offsets: np.ndarray, count: int) -> bool:
+        """Check that the last of the first `count` offsets ends a text record."""
+        if not count:
+            return self.texts_size == 0
+        start = int(offsets[count - 2]) if count > 1 else 0
+        with self.texts_path.open("rb") as f:
+            f.seek(start)
+            header = f.read(TEXT_LENGTH.size)
+        if len(header) < TEXT_LENGTH.size:
+            return False
+        (length,) = TEXT_LENGTH.unpack(header)
+        return start + TEXT_LENGTH.size + length == offsets[count - 1]
+
+    def read_offsets(self) -> np.ndarray:
+        """Memory-map the end offsets of the text records."""
+        count = self.offsets_path.stat().st_size // OFFSET_DTYPE.itemsize
+        if not count:
+            return np.zeros(0, dtype=OFFSET_DTYPE)
+        return np.memmap(self.offsets_path, dtype=OFFSET_DTYPE, mode="r", shape=count)
+
+    def load(self, dtype: str | np.dtype = np.float32) -> CacheContent:
+        """Open the stored entries without reading the texts into memory.
+
+        float32 embeddings are memory-mapped read-only, so several processes can
+        share the same pages. Other dtypes are quantized into memory. The texts are
+        read from the log on access.
+        """
+        count = self.compact()
+        content = CacheContent(buffer=create_default_embeddings(dtype))
+        if not count:
+            return content
+        vectors = self.read_vectors()
+        texts = TextLog(self.texts_path, self.read_offsets())
+        if content.exact:
+            return CacheContent(texts=texts, buffer=vectors, size=count)
+
+        content.texts = texts
+        content.reserve(count)
+        for start in range(0, count, BLOCK_SIZE):
+            content.append_vectors(vectors[start : start + BLOCK_SIZE])
+        return content
+
+    def read_vectors(self) -> np.ndarray:
+        """Memory-map the full-precision embeddings."""
+        count = self.vectors_path.stat().st_size // VECTOR_SIZE
+        if not count:
+            return create_default_embeddings()
+        if self.vectors is None or len(self.vectors) != count:
+            self.vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(count, EMBED_DIM)
+            )
+        return self.vectors
+
+
+def read_text_offsets(path: Path) -> np.ndarray:
+    """Scan a texts log for the end offset of every complete record."""
+    offsets = []
+    end = 0
+    size = path.stat().st_size
+    with path.open("rb") as f:
+        while end + TEXT_LENGTH.size <= size:
+            (length,) = TEXT_LENGTH.unpack(f.read(TEXT_LENGTH.size))
+            if end + TEXT_LENGTH.size + length > size:
+                break
+            end += TEXT_LENGTH.size + length
+            f.seek(end)
+            offsets.append(end)
+    return np.array(offsets, dtype=OFFSET_DTYPE)
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """Cluster unit-length vectors into `k` clusters by cosine similarity.
+
+    Returns:
+        np.ndarray: The unit-length centroids, one row per cluster.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)]
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        # Reseed the centroids of empty clusters with random vectors
+        empty = np.flatnonzero(np.bincount(assignments, minlength=k) == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index for approximate nearest-neighbour search.
+
+    Once `nlist * TRAIN_ROWS_PER_LIST` rows were added, the rows are clustered into
+    `nlist` lists with spherical k-means. A query then only scores the rows in the
+    `nprobe` lists whose centroids are closest to it, so `nprobe` trades recall for
+    latency. New rows are appended to the list of their closest centroid, and the
+    centroids are retrained whenever the number of rows has doubled since the last
+    training.
+
+    The centroids are stored in `{name}.ivf.npz` and the list of every row is
+    appended to `{name}.assignments`.
+    """
+
+    def __init__(self, directory: Path, name: str, nlist: int, nprobe: int) -> None:
+        self.centroids_path = directory / f"{name}.ivf.npz"
+        self.assignments_path = directory / f"{name}.assignments"
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids: np.ndarray | None = None
+        self.lists: List[List[int]] = []
+        self.size = 0
+        self.trained_size = 0
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def clear(self) -> None:
+        """Forget the centroids and all indexed rows."""
+        self.centroids = None
+        self.lists = []
+        self.size = 0
+        self.trained_size = 0
+        self.centroids_path.unlink(missing_ok=True)
+        self.assignments_path.unlink(missing_ok=True)
+
+    def load(self, content: CacheContent) -> None:
+        """Load the stored index and index any rows of `content` it is missing.
+
+        A stored index with a different number of lists is discarded.
+        """
+        if self.centroids_path.exists() and self.assignments_path.exists():
+            with np.load(self.centroids_path) as stored:
+                self.centroids = stored["centroids"]
+                self.trained_size = int(stored["trained_size"])
+            if len(self.centroids) != self.nlist:
+                # LOCAL_CACHE_IVF_NLIST changed, so retrain with the new one
+                self.clear()
+                self.add(content)
+                return
+            assignments = np.fromfile(self.assignments_path, dtype=np.int32)
+            assignments = assignments[: content.size]
+            with self.assignments_path.open("r+b") as f:
+                f.truncate(assignments.nbytes)
+            self.set_lists(assignments)
+        self.add(content)
+
+    def add(self, content: CacheContent) -> None:
+        """Index the rows of `content` that are not indexed yet."""
+        if not self.trained:
+            if content.size >= self.nlist * TRAIN_ROWS_PER_LIST:
+                self.train(content)
+            return
+        if content.size >= 2 * self.trained_size:
+            self.train(content)
+            return
+
+        assignments = self.assign(content, self.size)
+        for row, list_id in enumerate(assignments, start=self.size):
+            self.lists[list_id].append(row)
+        with self.assignments_path.open("ab") as f:
+            f.write(assignments.tobytes())
+        self.size = content.size
+
+    def train(self, content: CacheContent) -> None:
+        """Compute new centroids and reassign all rows to them."""
+        sample = np.arange(content.size)
+        if content.size > self.nlist * MAX_TRAIN_ROWS_PER_LIST:
+            rng = np.random.default_rng(0)
+            sample = rng.choice(sample, self.nlist * MAX_TRAIN_ROWS_PER_LIST, False)
+            sample.sort()
+        self.centroids = spherical_kmeans(content.decode(sample), self.nlist)
+        assignments = self.assign(content)
+        self.set_lists(assignments)
+        self.trained_size = content.size
+        np.savez(
+            self.centroids_path,
+            centroids=self.centroids,
+            trained_size=self.trained_size,
+        )
+        assignments.tofile(self.assignments_path)
+
+    def assign(self, content: CacheContent, start: int = 0) -> np.ndarray:
+        """Return the list of the closest centroid for every row from `start` on."""
+        assignments = np.empty(content.size - start, dtype=np.int32)
+        for block_start in range(start, content.size, BLOCK_SIZE):
+            block = slice(block_start, min(block_start + BLOCK_SIZE, content.size))
+            assignments[block_start - start : block.stop - start] = np.argmax(
+                content.decode(block) @ self.centroids.T, axis=1
+            )
+        return assignments
+
+    def set_lists(self, assignments: np.ndarray) -> None:
+        """Rebuild the inverted lists from the list of every row."""
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(self.nlist + 1))
+        self.lists = [
+            order[bounds[i] : bounds[i + 1]].tolist() for i in range(self.nlist)
+        ]
+        self.size = len(assignments)
+
+    def search(
+        self, queries: np.ndarray, content: CacheContent, k: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Find the approximate top-k rows for every query.
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: The row indices and scores of the
+                best rows for every query, best first.
+        """
+        probes = top_k_indices(queries @ self.centroids.T, self.nprobe)
+        results = []
+        for query, probe in zip(queries, probes):
+            candidates = np.fromiter(
+                itertools.chain.from_iterable(self.lists[i] for i in probe),
+                dtype=np.int64,
+            )
+            candidates.sort()
+            scores = content.score(query[np.newaxis, :], candidates)[0]
+            best = top_k_indices(scores, k)
+            results.append((candidates[best], scores[best]))
+        return results
 
 
 class LocalCache(MemoryProviderSingleton):
-    """A class that stores the memory in a local file"""
+    """A class that stores the memory in local append-only files"""
 
     def __init__(self, cfg) -> None:
         """Initialize a class instance
@@ -38,16 +536,33 @@ class LocalCache(MemoryProviderSingleton):
         Returns:
             None
         """
-        workspace_path = Path(cfg.workspace_path)
-        self.filename = workspace_path / f"{cfg.memory_index}.json"
-
-        self.filename.touch(exist_ok=True)
-
-        file_content = b"{}"
-        with self.filename.open("w+b") as f:
-            f.write(file_content)
+        self.files = CacheFiles(
+            Path(cfg.workspace_path),
+            cfg.memory_index,
+            sync_interval=cfg.local_cache_sync_interval,
+        )
 
-        self.data = CacheContent()
+        self.index = None
+        if cfg.local_cache_index == "ivf":
+            self.index = IVFIndex(
+                Path(cfg.workspace_path),
+                cfg.memory_index,
+                nlist=cfg.local_cache_ivf_nlist,
+                nprobe=cfg.local_cache_ivf_nprobe,
+            )
+
+        self.dtype = np.dtype(cfg.local_cache_dtype)
+        self.rerank_factor = cfg.local_cache_rerank_factor
+
+        if cfg.local_cache_persist:
+            self.data = self.files.load(self.dtype)
+            if self.index:
+                self.index.load(self.data)
+        else:
+            self.files.truncate()
+            self.data = CacheContent(buffer=create_default_embeddings(self.dtype))
+            if self.index:
+                self.index.clear()
 
     def add(self, text: str):
         """
@@ -61,24 +576,43 @@ class LocalCache(MemoryProviderSingleton):
         """
         if "Command Error:" in text:
             return ""
-        self.data.texts.append(text)
 
-        embedding = get_ada_embedding(text)
+        vector = np.asarray(get_ada_embedding(text), dtype=np.float32)
+        self.data.append([text], vector[np.newaxis, :])
+        self.files.append([text], vector[np.newaxis, :])
+        if self.index:
+            self.index.add(self.data)
+        return text
+
+    def add_many(
+        self, texts: Iterable[str], embeddings: Optional[np.ndarray] = None
+    ) -> List[str]:
+        """
+        Add several texts at once, growing the embeddings-matrix and writing to the
+            backing files only once for the whole batch
 
-        vector = np.array(embedding).astype(np.float32)
-        vector = vector[np.newaxis, :]
-        self.data.embeddings = np.concatenate(
-            [
-                self.data.embeddings,
-                vector,
-            ],
-            axis=0,
-        )
+        Args:
+            texts: Iterable[str]
+            embeddings: The embeddings of the texts, to not embed them again
 
-        with open(self.filename, "wb") as f:
-            out = orjson.dumps(self.data, option=SAVE_OPTIONS)
-            f.write(out)
-        return text
+        Returns: List[str] of the texts that were added
+        """
+        texts = list(texts)
+        kept = [i for i, text in enumerate(texts) if "Command Error:" not in text]
+        if not kept:
+            return []
+        texts = [texts[i] for i in kept]
+
+        if embeddings is None:
+            embeddings = get_ada_embeddings(texts)
+        else:
+            embeddings = np.asarray(embeddings)[kept]
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        self.data.append(texts, vectors)
+        self.files.append(texts, vectors)
+        if self.index:
+            self.index.add(self.data)
+        return texts
 
     def clear(self) -> str:
         """
@@ -86,7 +620,10 @@ class LocalCache(MemoryProviderSingleton):
 
         Returns: A message indicating that the memory has been cleared.
         """
-        self.data = CacheContent()
+        self.data = CacheContent(buffer=create_default_embeddings(self.dtype))
+        self.files.truncate()
+        if self.index:
+            self.index.clear()
         return "Obliviated"
 
     def get(self, data: str) -> list[Any] | None:
@@ -111,13 +648,71 @@ class LocalCache(MemoryProviderSingleton):
 
         Returns: List[str]
         """
-        embedding = get_ada_embedding(text)
+        query = np.asarray(get_ada_embedding(text), dtype=np.float32)[np.newaxis, :]
+        indices, _ = self._search(query, k)[0]
+
+        return [self.data.texts[i] for i in indices]
+
+    def get_relevant_many(
+        self, texts: List[str], k: int
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Embed all queries in one request and score them against the
+            embeddings-matrix with a single matrix-matrix mult
+
+        Args:
+            texts: List[str]
+            k: int
 
-        scores = np.dot(self.data.embeddings, embedding)
+        Returns: List[List[Tuple[str, float]]] of the top-k (text, score) pairs
+            for every query, best first
+        """
+        if not texts:
+            return []
+        embeddings = np.asarray(get_ada_embeddings(texts), dtype=np.float32)
+
+        return [
+            [(self.data.texts[i], float(score)) for i, score in zip(indices, scores)]
+            for indices, scores in self._search(embeddings, k)
+        ]
+
+    def _search(
+        self, queries: np.ndarray, k: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find the top-k rows for every query, through the ANN index once it is
+            trained and by scoring every row otherwise. With quantized
+            embeddings, `rerank_factor * k` candidates are re-scored against
+            the full-precision embeddings on disk
 
-        top_k_indices = np.argsort(scores)[-k:][::-1]
+        Args:
+            queries: np.ndarray with one embedding per row
+            k: int
 
-        return [self.data.texts[i] for i in top_k_indices]
+        Returns: List[Tuple[np.ndarray, np.ndarray]] of the row indices and
+            scores for every query, best first
+        """
+        num_candidates = k if self.data.exact else k * self.rerank_factor
+        if self.index and self.index.trained:
+            results = self.index.search(queries, self.data, num_candidates)
+        else:
+            scores = self.data.score(queries)
+            results = [
+                (indices, query_scores[indices])
+                for query_scores, indices in zip(
+                    scores, top_k_indices(scores, num_candidates)
+                )
+            ]
+        if self.data.exact:
+            return results
+
+        vectors = self.files.read_vectors()
+        reranked = []
+        for query, (candidates, _) in zip(queries, results):
+            scores = vectors[candidates] @ query
+            best = top_k_indices(scores, k)
+            reranked.append((candidates[best], scores[best]))
+        return reranked
 
     def get_stats(self) -> tuple[int, tuple[int, ...]]:
         """
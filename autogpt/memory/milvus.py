@@ -4,7 +4,7 @@ import re
 from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, connections
 
 from autogpt.config import Config
-from autogpt.llm import get_ada_embedding
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
 from autogpt.memory.base import MemoryProviderSingleton
 
 
@@ -99,7 +99,7 @@ class MilvusMemory(MemoryProviderSingleton):
         Returns:
             str: log.
         """
-        embedding = get_ada_embedding(data)
+        embedding = get_ada_embedding(data).tolist()
         result = self.collection.insert([[embedding], [data]])
         _text = (
             "Inserting data into memory at primary key: "
@@ -107,6 +107,28 @@ class MilvusMemory(MemoryProviderSingleton):
         )
         return _text
 
+    def add_many(self, data, embeddings=None) -> list[str]:
+        """Add the embeddings of several texts into memory with a single insert.
+
+        Args:
+            data (list[str]): The raw texts to construct embedding indexes.
+            embeddings (np.ndarray, optional): The embeddings of the texts, to not
+                embed them again.
+
+        Returns:
+            list[str]: logs.
+        """
+        if not data:
+            return []
+        if embeddings is None:
+            embeddings = get_ada_embeddings(data)
+        embeddings = embeddings.tolist()
+        result = self.collection.insert([embeddings, data])
+        return [
+            f"Inserting data into memory at primary key: {primary_key}:\n data: {item}"
+            for primary_key, item in zip(result.primary_keys, data)
+        ]
+
     def get(self, data):
         """Return the most relevant data in memory.
         Args:
@@ -141,7 +163,7 @@ class MilvusMemory(MemoryProviderSingleton):
             list: The top-k relevant data.
         """
         # search the embedding and return the most relevant text.
-        embedding = get_ada_embedding(data)
+        embedding = get_ada_embedding(data).tolist()
         search_params = {
             "metrics_type": "IP",
             "params": {"nprobe": 8},
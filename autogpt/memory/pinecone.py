@@ -1,10 +1,13 @@
 import pinecone
 from colorama import Fore, Style
 
-from autogpt.llm import get_ada_embedding
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
 from autogpt.logs import logger
 from autogpt.memory.base import MemoryProviderSingleton
 
+# Pinecone recommends upserting at most 100 vectors per request
+UPSERT_BATCH_SIZE = 100
+
 
 class PineconeMemory(MemoryProviderSingleton):
     def __init__(self, cfg):
@@ -47,13 +50,31 @@ class PineconeMemory(MemoryProviderSingleton):
         self.index = pinecone.Index(table_name)
 
     def add(self, data):
-        vector = get_ada_embedding(data)
+        vector = get_ada_embedding(data).tolist()
         # no metadata here. We may wish to change that long term.
         self.index.upsert([(str(self.vec_num), vector, {"raw_text": data})])
         _text = f"Inserting data into memory at index: {self.vec_num}:\n data: {data}"
         self.vec_num += 1
         return _text
 
+    def add_many(self, data, embeddings=None):
+        if embeddings is None:
+            embeddings = get_ada_embeddings(data)
+        vectors = embeddings.tolist()
+        items = [
+            (str(self.vec_num + i), vector, {"raw_text": item})
+            for i, (item, vector) in enumerate(zip(data, vectors))
+        ]
+        for start in range(0, len(items), UPSERT_BATCH_SIZE):
+            self.index.upsert(items[start : start + UPSERT_BATCH_SIZE])
+        texts = [
+            f"Inserting data into memory at index: {vec_id}:\n"
+            f" data: {metadata['raw_text']}"
+            for vec_id, _, metadata in items
+        ]
+        self.vec_num += len(items)
+        return texts
+
     def get(self, data):
         return self.get_relevant(data, 1)
 
@@ -67,7 +88,7 @@ class PineconeMemory(MemoryProviderSingleton):
         :param data: The data to compare to.
         :param num_relevant: The number of relevant data to return. Defaults to 5
         """
-        query_embedding = get_ada_embedding(data)
+        query_embedding = get_ada_embedding(data).tolist()
         results = self.index.query(
             query_embedding, top_k=num_relevant, include_metadata=True
         )
@@ -1,7 +1,7 @@
 """Redis memory provider."""
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional
 
 import numpy as np
 import redis
@@ -10,7 +10,7 @@ from redis.commands.search.field import TextField, VectorField
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from redis.commands.search.query import Query
 
-from autogpt.llm import get_ada_embedding
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
 from autogpt.logs import logger
 from autogpt.memory.base import MemoryProviderSingleton
 
@@ -88,8 +88,7 @@ class RedisMemory(MemoryProviderSingleton):
         """
         if "Command Error:" in data:
             return ""
-        vector = get_ada_embedding(data)
-        vector = np.array(vector).astype(np.float32).tobytes()
+        vector = np.asarray(get_ada_embedding(data), dtype=np.float32).tobytes()
         data_dict = {b"data": data, "embedding": vector}
         pipe = self.redis.pipeline()
         pipe.hset(f"{self.cfg.memory_index}:{self.vec_num}", mapping=data_dict)
@@ -101,6 +100,42 @@ class RedisMemory(MemoryProviderSingleton):
         pipe.execute()
         return _text
 
+    def add_many(
+        self, data: list[str], embeddings: Optional[np.ndarray] = None
+    ) -> list[str]:
+        """
+        Adds several data points to the memory with a single embedding request
+            and a single pipeline round trip.
+
+        Args:
+            data: The data to add.
+            embeddings: The embeddings of the data, to not embed it again.
+
+        Returns: Messages indicating that the data has been added.
+        """
+        kept = [i for i, item in enumerate(data) if "Command Error:" not in item]
+        if not kept:
+            return []
+        data = [data[i] for i in kept]
+        if embeddings is None:
+            embeddings = get_ada_embeddings(data)
+        else:
+            embeddings = np.asarray(embeddings)[kept]
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        pipe = self.redis.pipeline()
+        texts = []
+        for item, vector in zip(data, vectors):
+            data_dict = {b"data": item, "embedding": vector.tobytes()}
+            pipe.hset(f"{self.cfg.memory_index}:{self.vec_num}", mapping=data_dict)
+            texts.append(
+                f"Inserting data into memory at index: {self.vec_num}:\n"
+                f"data: {item}"
+            )
+            self.vec_num += 1
+        pipe.set(f"{self.cfg.memory_index}-vec_num", self.vec_num)
+        pipe.execute()
+        return texts
+
     def get(self, data: str) -> list[Any] | None:
         """
         Gets the data from the memory that is most relevant to the given data.
@@ -138,7 +173,7 @@ class RedisMemory(MemoryProviderSingleton):
             .sort_by("vector_score")
             .dialect(2)
         )
-        query_vector = np.array(query_embedding).astype(np.float32).tobytes()
+        query_vector = np.asarray(query_embedding, dtype=np.float32).tobytes()
 
         try:
             results = self.redis.ft(f"{self.cfg.memory_index}").search(
@@ -3,7 +3,7 @@ from weaviate import Client
 from weaviate.embedded import EmbeddedOptions
 from weaviate.util import generate_uuid5
 
-from autogpt.llm import get_ada_embedding
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
 from autogpt.logs import logger
 from autogpt.memory.base import MemoryProviderSingleton
 
@@ -71,7 +71,7 @@ class WeaviateMemory(MemoryProviderSingleton):
             return None
 
     def add(self, data):
-        vector = get_ada_embedding(data)
+        vector = get_ada_embedding(data).tolist()
 
         doc_uuid = generate_uuid5(data, self.index)
         data_object = {"raw_text": data}
@@ -86,6 +86,27 @@ class WeaviateMemory(MemoryProviderSingleton):
 
         return f"Inserting data into memory at uuid: {doc_uuid}:\n data: {data}"
 
+    def add_many(self, data, embeddings=None):
+        if embeddings is None:
+            embeddings = get_ada_embeddings(data)
+        vectors = embeddings.tolist()
+
+        texts = []
+        with self.client.batch as batch:
+            for item, vector in zip(data, vectors):
+                doc_uuid = generate_uuid5(item, self.index)
+                batch.add_data_object(
+                    uuid=doc_uuid,
+                    data_object={"raw_text": item},
+                    class_name=self.index,
+                    vector=vector,
+                )
+                texts.append(
+                    f"Inserting data into memory at uuid: {doc_uuid}:\n data: {item}"
+                )
+
+        return texts
+
     def get(self, data):
         return self.get_relevant(data, 1)
 
@@ -100,7 +121,7 @@ class WeaviateMemory(MemoryProviderSingleton):
         return "Obliterated"
 
     def get_relevant(self, data, num_relevant=5):
-        query_embedding = get_ada_embedding(data)
+        query_embedding = get_ada_embedding(data).tolist()
         try:
             results = (
                 self.client.query.get(self.index, ["raw_text"])
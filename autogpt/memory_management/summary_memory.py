@@ -1,50 +1,67 @@
-import copy
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, List, Tuple
 
 from autogpt.agent import Agent
 from autogpt.config import Config
 from autogpt.llm.llm_utils import create_chat_completion
+from autogpt.llm.scheduler import Priority
 from autogpt.log_cycle.log_cycle import PROMPT_SUMMARY_FILE_NAME, SUMMARY_FILE_NAME
+from autogpt.logs import logger
 
 cfg = Config()
 
+# A single worker, so background updates build on each other in order
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+
+
+# Number of assistant replies whose thoughts-stripped form is remembered
+STRIPPED_REPLY_CACHE_SIZE = 1024
+
 
 def get_newly_trimmed_messages(
     full_message_history: List[Dict[str, str]],
-    current_context: List[Dict[str, str]],
+    window_start: int,
     last_memory_index: int,
 ) -> Tuple[List[Dict[str, str]], int]:
     """
-    This function returns a list of dictionaries contained in full_message_history
-    with an index higher than prev_index that are absent from current_context.
+    This function returns the messages of full_message_history with an index
+    higher than last_memory_index that have been trimmed from the context window.
 
     Args:
         full_message_history (list): A list of dictionaries representing the full message history.
-        current_context (list): A list of dictionaries representing the current context.
-        last_memory_index (int): An integer representing the previous index.
+        window_start (int): The index of the first message in the context window.
+        last_memory_index (int): The index of the last message already summarized.
 
     Returns:
-        list: A list of dictionaries that are in full_message_history with an index higher than last_memory_index and absent from current_context.
+        list: The messages between last_memory_index and window_start.
         int: The new index value for use in the next loop.
     """
-    # Select messages in full_message_history with an index higher than last_memory_index
-    new_messages = [
-        msg for i, msg in enumerate(full_message_history) if i > last_memory_index
-    ]
+    new_messages = full_message_history[last_memory_index + 1 : window_start]
+    return new_messages, max(last_memory_index, window_start - 1)
 
-    # Remove messages that are already present in current_context
-    new_messages_not_in_context = [
-        msg for msg in new_messages if msg not in current_context
-    ]
 
-    # Find the index of the last message processed
-    new_index = last_memory_index
-    if new_messages_not_in_context:
-        last_message = new_messages_not_in_context[-1]
-        new_index = full_message_history.index(last_message)
+@lru_cache(maxsize=STRIPPED_REPLY_CACHE_SIZE)
+def strip_thoughts(content: str) -> str:
+    """
+    This function removes the "thoughts" of an assistant reply, so that only its
+    command is summarized. Replies are stripped once and then remembered.
+
+    Args:
+        content (str): The assistant reply, a JSON object.
 
-    return new_messages_not_in_context, new_index
+    Returns:
+        str: The reply without its thoughts, or unchanged if it is not JSON.
+    """
+    try:
+        content_dict = json.loads(content)
+    except json.JSONDecodeError:
+        return content
+    if not isinstance(content_dict, dict) or "thoughts" not in content_dict:
+        return content
+    del content_dict["thoughts"]
+    return json.dumps(content_dict)
 
 
 def update_running_summary(
@@ -66,30 +83,24 @@ def update_running_summary(
         update_running_summary(new_events)
         # Returns: "This reminds you of these events from your past: \nI entered the kitchen and found a scrawled note saying 7."
     """
-    # Create a copy of the new_events list to prevent modifying the original list
-    new_events = copy.deepcopy(new_events)
-
-    # Replace "assistant" with "you". This produces much better first person past tense results.
+    # Build new events instead of modifying the message history
+    events = []
     for event in new_events:
-        if event["role"].lower() == "assistant":
-            event["role"] = "you"
-
+        role = event["role"].lower()
+        # Replace "assistant" with "you". This produces much better first person past tense results.
+        if role == "assistant":
             # Remove "thoughts" dictionary from "content"
-            content_dict = json.loads(event["content"])
-            if "thoughts" in content_dict:
-                del content_dict["thoughts"]
-            event["content"] = json.dumps(content_dict)
-
-        elif event["role"].lower() == "system":
-            event["role"] = "your computer"
-
-        # Delete all user messages
-        elif event["role"] == "user":
-            new_events.remove(event)
+            events.append({"role": "you", "content": strip_thoughts(event["content"])})
+        elif role == "system":
+            events.append({"role": "your computer", "content": event["content"]})
+        # Skip all user messages
+        elif role != "user":
+            events.append(event)
+    new_events = events
 
     # This can happen at any point during execution, not just the beginning
     if len(new_events) == 0:
-        new_events = "Nothing new happened."
+        return current_memory
 
     prompt = f'''Your task is to create a concise running summary of actions and information results in the provided text, focusing on key and potentially important information to remember.
 
@@ -120,7 +131,9 @@ Latest Development:
         PROMPT_SUMMARY_FILE_NAME,
     )
 
-    current_memory = create_chat_completion(messages, cfg.fast_llm_model)
+    current_memory = create_chat_completion(
+        messages, cfg.fast_llm_model, priority=Priority.LOW
+    )
 
     agent.log_cycle_handler.log_cycle(
         agent.config.ai_name,
@@ -136,3 +149,32 @@ Latest Development:
     }
 
     return message_to_return
+
+
+def update_running_summary_in_background(
+    agent: Agent, new_events: List[Dict[str, str]]
+) -> Future:
+    """
+    This function queues an update of the agent's running summary and returns
+    without waiting for it. The agent keeps its current summary until the update
+    finishes, so the new summary is used from a later cycle on.
+
+    Args:
+        agent (Agent): The agent whose summary_memory is updated.
+        new_events (List[Dict]): The latest events to be added to the summary.
+
+    Returns:
+        Future: Completes when agent.summary_memory has been updated.
+    """
+
+    def update() -> None:
+        try:
+            agent.summary_memory = update_running_summary(
+                agent,
+                current_memory=agent.summary_memory,
+                new_events=new_events,
+            )
+        except Exception as e:
+            logger.warn(f"Failed to update the running summary: {e}")
+
+    return _summary_executor.submit(update)
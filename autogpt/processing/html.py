@@ -1,9 +1,38 @@
 """HTML processing functions"""
 from __future__ import annotations
 
-from bs4 import BeautifulSoup
+import copy
+import re
+
+from bs4 import BeautifulSoup, Tag
 from requests.compat import urljoin
 
+# Tags that are never part of the main content. Forms are kept, as some sites
+# (e.g. ASP.NET ones) wrap the whole page in one.
+UNLIKELY_TAGS = ["nav", "footer", "aside", "iframe", "noscript", "svg"]
+# Classes and ids of elements that are most likely not part of the main content,
+# unless they also match MAYBE_CANDIDATES
+UNLIKELY_CANDIDATES = re.compile(
+    r"banner|breadcrumb|combx|comment|community|consent|cookie|disqus|extra|foot"
+    r"|header|menu|modal|newsletter|nav|pager|pagination|popup|related|remark"
+    r"|replies|rss|share|shoutbox|sidebar|skyscraper|social|sponsor|subscribe",
+    re.I,
+)
+MAYBE_CANDIDATES = re.compile(r"and|article|body|column|content|main|shadow", re.I)
+POSITIVE_NAMES = re.compile(
+    r"article|body|content|entry|hentry|main|page|post|text|blog|story", re.I
+)
+NEGATIVE_NAMES = re.compile(
+    r"hidden|banner|combx|comment|com-|contact|foot|footer|footnote|masthead"
+    r"|media|meta|outbrain|promo|related|scroll|share|shoutbox|sidebar|skyscraper"
+    r"|sponsor|shopping|tags|tool|widget",
+    re.I,
+)
+# Tags whose text is scored
+SCORED_TAGS = ["p", "pre", "td", "blockquote", "dd"]
+# Main content shorter than this is not trusted, and the whole text is used
+MIN_MAIN_CONTENT_LENGTH = 140
+
 
 def extract_hyperlinks(soup: BeautifulSoup, base_url: str) -> list[tuple[str, str]]:
     """Extract hyperlinks from a BeautifulSoup object
@@ -31,3 +60,135 @@ def format_hyperlinks(hyperlinks: list[tuple[str, str]]) -> list[str]:
         List[str]: The formatted hyperlinks
     """
     return [f"{link_text} ({link_url})" for link_text, link_url in hyperlinks]
+
+
+def extract_text(html: str, main_content_only: bool = False) -> str:
+    """Extract the text of a webpage
+
+    Args:
+        html (str): The HTML of the webpage
+        main_content_only (bool): Whether to only keep the main content of the
+            page, see `extract_main_content`. Falls back to the whole text if no
+            main content is found.
+
+    Returns:
+        str: The text without scripts, styles and blank lines
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    for script in soup(["script", "style"]):
+        script.extract()
+
+    if main_content_only:
+        blocks = extract_main_content(copy.copy(soup))
+        text = "\n".join(clean_text(block.get_text()) for block in blocks)
+        if len(text) >= MIN_MAIN_CONTENT_LENGTH:
+            return text
+
+    return clean_text(soup.get_text())
+
+
+def clean_text(text: str) -> str:
+    """Strip the lines of a text and remove blank ones
+
+    Args:
+        text (str): The text to clean
+
+    Returns:
+        str: The cleaned text
+    """
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return "\n".join(chunk for chunk in chunks if chunk)
+
+
+def extract_main_content(soup: BeautifulSoup) -> list[Tag]:
+    """Find the blocks of the main content of a page, like Readability does
+
+    Navigation, forms and elements whose class or id looks like a menu, footer,
+    sidebar or banner are removed. Text blocks then give their parent and
+    grandparent a score for their length and number of commas, which is scaled
+    down by the share of link text. The best scored element and the siblings
+    that score close to it are the main content.
+
+    Args:
+        soup (BeautifulSoup): The page, which gets modified
+
+    Returns:
+        list[Tag]: The blocks of the main content in page order, or an empty list
+    """
+    for tag in soup(UNLIKELY_TAGS):
+        tag.extract()
+    for tag in soup.find_all(True):
+        if tag.decomposed or tag.name in ("html", "body"):
+            continue
+        names = _class_and_id(tag)
+        if UNLIKELY_CANDIDATES.search(names) and not MAYBE_CANDIDATES.search(names):
+            tag.decompose()
+
+    scores: dict[int, float] = {}
+    candidates: dict[int, Tag] = {}
+    for block in soup.find_all(SCORED_TAGS):
+        text = block.get_text(" ", strip=True)
+        if len(text) < 25:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        for level, ancestor in enumerate(block.parents):
+            if level == 2 or ancestor.name in (None, "[document]"):
+                break
+            if id(ancestor) not in candidates:
+                candidates[id(ancestor)] = ancestor
+                scores[id(ancestor)] = _class_weight(ancestor)
+            scores[id(ancestor)] += score / (level + 1)
+    if not candidates:
+        return []
+
+    for key, candidate in candidates.items():
+        scores[key] *= 1 - link_density(candidate)
+    top_key = max(scores, key=scores.__getitem__)
+    top = candidates[top_key]
+    if top.parent is None:
+        return [top]
+
+    threshold = max(10.0, scores[top_key] * 0.2)
+    blocks = []
+    for sibling in top.parent.children:
+        if not isinstance(sibling, Tag):
+            continue
+        if sibling is top or scores.get(id(sibling), 0) >= threshold:
+            blocks.append(sibling)
+        elif sibling.name == "p":
+            text = sibling.get_text(" ", strip=True)
+            if len(text) > 80 and link_density(sibling) < 0.25:
+                blocks.append(sibling)
+    return blocks
+
+
+def link_density(tag: Tag) -> float:
+    """Get the share of a tag's text that is link text
+
+    Args:
+        tag (Tag): The tag
+
+    Returns:
+        float: The length of the link text divided by the length of the text
+    """
+    text_length = len(tag.get_text(" ", strip=True))
+    if not text_length:
+        return 0.0
+    link_length = sum(len(a.get_text(" ", strip=True)) for a in tag.find_all("a"))
+    return min(link_length / text_length, 1.0)
+
+
+def _class_and_id(tag: Tag) -> str:
+    return " ".join([*(tag.get("class") or []), tag.get("id") or ""])
+
+
+def _class_weight(tag: Tag) -> float:
+    names = _class_and_id(tag)
+    weight = 0.0
+    if POSITIVE_NAMES.search(names):
+        weight += 25
+    if NEGATIVE_NAMES.search(names):
+        weight -= 25
+    return weight
@@ -0,0 +1,233 @@
+"""Disk-backed cache of scraped page text and of summaries of it."""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from autogpt.config import Config
+from autogpt.llm.sqlite_cache import SQLiteCache
+from autogpt.logs import logger
+from autogpt.singleton import Singleton
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    text TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    links TEXT,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (url, mode)
+);
+CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+CREATE TABLE IF NOT EXISTS summaries (
+    key TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used);
+"""
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so that different spellings of the same page share a key.
+
+    The scheme and host are lowercased, default ports and fragments are removed
+    and the query parameters are sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def content_hash(content: str | bytes) -> str:
+    """Get the hash that identifies a version of a page."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def extraction_mode(browser: bool = False) -> str:
+    """Get the key of how the text of a page is extracted.
+
+    Pages rendered in a browser and pages fetched over HTTP, with or without
+    BROWSE_MAIN_CONTENT_ONLY, give different text and are cached separately.
+    """
+    source = "browser" if browser else "http"
+    content = "main" if Config().browse_main_content_only else "all"
+    return f"{source}:{content}"
+
+
+def summary_key(url: str, text: str, question: str, model: str) -> str:
+    """Get the cache key of a summary of a page's text.
+
+    The key includes the hash of the text, so summaries of an older version of
+    the page are not returned. Questions that only differ in case and whitespace
+    share a key.
+    """
+    request = {
+        "url": normalize_url(url),
+        "text": content_hash(text),
+        "question": " ".join(question.lower().split()),
+        "model": model,
+    }
+    return hashlib.sha256(
+        json.dumps(request, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+@dataclass
+class CachedPage:
+    """The text extracted from a page, and how to check whether it changed."""
+
+    text: str
+    content_hash: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool
+    links: Optional[list[str]] = None
+
+    def validators(self) -> dict:
+        """Get the headers of a request that only returns the page if it changed."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache(SQLiteCache, metaclass=Singleton):
+    """SQLite cache of scraped page text and summaries.
+
+    Pages younger than `ttl` seconds are used without fetching them again. Older
+    pages are kept so they can be revalidated with their ETag or Last-Modified
+    header. Summaries expire after `summary_ttl` seconds. Each table holds at
+    most `max_entries` rows, evicting the least recently used ones.
+    """
+
+    schema = SCHEMA
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        ttl: float | None = None,
+        summary_ttl: float | None = None,
+        max_entries: int | None = None,
+    ) -> None:
+        cfg = Config()
+        super().__init__(
+            path or cfg.page_cache_path, max_entries or cfg.page_cache_max_entries
+        )
+        self.ttl = ttl if ttl is not None else cfg.page_cache_ttl
+        self.summary_ttl = (
+            summary_ttl if summary_ttl is not None else cfg.page_cache_summary_ttl
+        )
+
+    def get_page(self, url: str, mode: str) -> Optional[CachedPage]:
+        """Look up the text of a page extracted in the given `extraction_mode`,
+        fresh or not, None if it is missing."""
+        now = time.time()
+        key = (normalize_url(url), mode)
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT text, content_hash, etag, last_modified, links, created"
+                " FROM pages WHERE url = ? AND mode = ?",
+                key,
+            ).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE pages SET last_used = ? WHERE url = ? AND mode = ?",
+                    (now, *key),
+                )
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        text, page_hash, etag, last_modified, links, created = row
+        return CachedPage(
+            text,
+            page_hash,
+            etag,
+            last_modified,
+            fresh=created >= now - self.ttl,
+            links=json.loads(links) if links is not None else None,
+        )
+
+    def put_page(
+        self,
+        url: str,
+        mode: str,
+        text: str,
+        page_hash: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        links: Optional[list[str]] = None,
+    ) -> None:
+        """Store the text of a page extracted in the given `extraction_mode`, with
+        the `content_hash` and the validators of the response it was extracted
+        from, and the links found on the page."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    normalize_url(url),
+                    mode,
+                    text,
+                    page_hash,
+                    etag,
+                    last_modified,
+                    json.dumps(links) if links is not None else None,
+                    now,
+                    now,
+                ),
+            )
+            self.evict("pages")
+
+    def get_summary(self, key: str) -> Optional[str]:
+        """Look up a summary by its `summary_key`, None if it is missing or
+        expired."""
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT summary FROM summaries WHERE key = ? AND created >= ?",
+                (key, now - self.summary_ttl),
+            ).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE summaries SET last_used = ? WHERE key = ?", (now, key)
+                )
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.debug("Page summary cache hit")
+        return row[0]
+
+    def put_summary(self, key: str, summary: str) -> None:
+        """Store a summary by its `summary_key`."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM summaries WHERE created < ?", (now - self.summary_ttl,)
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                (key, summary, now, now),
+            )
+            self.evict("summaries")
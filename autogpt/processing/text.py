@@ -1,16 +1,53 @@
 """Text processing functions"""
-from typing import Dict, Generator, Optional
+import asyncio
+from functools import lru_cache
+from typing import Dict, Generator, List, Optional, Tuple
 
+import numpy as np
 import spacy
 from selenium.webdriver.remote.webdriver import WebDriver
 
 from autogpt.config import Config
 from autogpt.llm import count_message_tokens, create_chat_completion
+from autogpt.llm.llm_utils import get_ada_embeddings
+from autogpt.llm.providers.openai import acreate_chat_completion, run_concurrently
+from autogpt.llm.scheduler import Priority
+from autogpt.llm.token_counter import count_string_tokens
 from autogpt.logs import logger
 from autogpt.memory import get_memory
+from autogpt.memory.no_memory import NoMemory
+from autogpt.processing.page_cache import PageCache, summary_key
 
 CFG = Config()
 
+# Trained components of spaCy pipelines that are not needed to split sentences
+SPACY_UNUSED_COMPONENTS = [
+    "transformer",
+    "tok2vec",
+    "tagger",
+    "morphologizer",
+    "parser",
+    "senter",
+    "attribute_ruler",
+    "lemmatizer",
+    "ner",
+]
+
+
+@lru_cache(maxsize=None)
+def get_sentencizer(language_model: str) -> spacy.language.Language:
+    """Load a spaCy pipeline that only splits sentences, once per process
+
+    Args:
+        language_model (str): The name of the spaCy pipeline to load
+
+    Returns:
+        spacy.language.Language: The tokenizer of the pipeline and a sentencizer
+    """
+    nlp = spacy.load(language_model, exclude=SPACY_UNUSED_COMPONENTS)
+    nlp.add_pipe("sentencizer")
+    return nlp
+
 
 def split_text(
     text: str,
@@ -31,37 +68,28 @@ def split_text(
         ValueError: If the text is longer than the maximum length
     """
     flatened_paragraphs = " ".join(text.split("\n"))
-    nlp = spacy.load(CFG.browse_spacy_language_model)
-    nlp.add_pipe("sentencizer")
+    nlp = get_sentencizer(CFG.browse_spacy_language_model)
     doc = nlp(flatened_paragraphs)
     sentences = [sent.text.strip() for sent in doc.sents]
 
+    # Every sentence is counted once with the space that joins it to the chunk,
+    # which is at least as many tokens as it adds to the joined chunk.
+    message_tokens = count_message_tokens([create_message("", question)], model) + 1
     current_chunk = []
+    current_tokens = message_tokens
 
     for sentence in sentences:
-        message_with_additional_sentence = [
-            create_message(" ".join(current_chunk) + " " + sentence, question)
-        ]
-
-        expected_token_usage = (
-            count_message_tokens(messages=message_with_additional_sentence, model=model)
-            + 1
-        )
-        if expected_token_usage <= max_length:
+        sentence_tokens = count_string_tokens(" " + sentence, model)
+        if current_tokens + sentence_tokens <= max_length:
             current_chunk.append(sentence)
+            current_tokens += sentence_tokens
         else:
             yield " ".join(current_chunk)
             current_chunk = [sentence]
-            message_this_sentence_only = [
-                create_message(" ".join(current_chunk), question)
-            ]
-            expected_token_usage = (
-                count_message_tokens(messages=message_this_sentence_only, model=model)
-                + 1
-            )
-            if expected_token_usage > max_length:
+            current_tokens = message_tokens + sentence_tokens
+            if current_tokens > max_length:
                 raise ValueError(
-                    f"Sentence is too long in webpage: {expected_token_usage} tokens."
+                    f"Sentence is too long in webpage: {current_tokens} tokens."
                 )
 
     if current_chunk:
@@ -86,6 +114,31 @@ def summarize_text(
         return "Error: No text to summarize"
 
     model = CFG.fast_llm_model
+    if CFG.page_cache:
+        key = summary_key(url, text, question, model)
+        summary = PageCache().get_summary(key)
+        if summary is None:
+            summary = summarize_page(url, text, question, model, driver)
+            PageCache().put_summary(key, summary)
+        return summary
+    return summarize_page(url, text, question, model, driver)
+
+
+def summarize_page(
+    url: str, text: str, question: str, model: str, driver: Optional[WebDriver]
+) -> str:
+    """Summarize the chunks of a page's text and combine their summaries
+
+    Args:
+        url (str): The url of the text
+        text (str): The text to summarize
+        question (str): The question to ask the model
+        model (str): The model to use
+        driver (WebDriver): The webdriver to use to scroll the page
+
+    Returns:
+        str: The summary of the text
+    """
     text_length = len(text)
     logger.info(f"Text length: {text_length} characters")
 
@@ -95,17 +148,40 @@ def summarize_text(
             text, max_length=CFG.browse_chunk_max_length, model=model, question=question
         ),
     )
+
+    logger.info(f"Adding {len(chunks)} chunks to memory")
+    memory = get_memory(CFG)
+    memory_texts = [
+        f"Source: {url}\n" f"Raw content part#{i + 1}: {chunk}"
+        for i, chunk in enumerate(chunks)
+    ]
+    # the chunks are embedded once, for both memory and the relevance filter,
+    #  in one request with the question they are filtered by
+    embeddings = None
+    if filters_chunks(question):
+        embeddings = get_ada_embeddings(memory_texts + [question])
+    elif not isinstance(memory, NoMemory):
+        embeddings = get_ada_embeddings(memory_texts)
+    memory.add_many(
+        memory_texts, embeddings[: len(chunks)] if embeddings is not None else None
+    )
+
+    chunks = select_relevant_chunks(chunks, question, embeddings)
     scroll_ratio = 1 / len(chunks)
 
+    if CFG.browse_summary_map_reduce:
+        summaries, final_summary = map_reduce_summaries(chunks, question, model)
+        memory.add_many(
+            [
+                f"Source: {url}\n" f"Content summary part#{i + 1}: {summary}"
+                for i, summary in enumerate(summaries)
+            ]
+        )
+        return final_summary
+
     for i, chunk in enumerate(chunks):
         if driver:
             scroll_to_percentage(driver, scroll_ratio * i)
-        logger.info(f"Adding chunk {i + 1} / {len(chunks)} to memory")
-
-        memory_to_add = f"Source: {url}\n" f"Raw content part#{i + 1}: {chunk}"
-
-        memory = get_memory(CFG)
-        memory.add(memory_to_add)
 
         messages = [create_message(chunk, question)]
         tokens_for_chunk = count_message_tokens(messages, model)
@@ -116,17 +192,20 @@ def summarize_text(
         summary = create_chat_completion(
             model=model,
             messages=messages,
+            priority=Priority.LOW,
         )
         summaries.append(summary)
         logger.info(
-            f"Added chunk {i + 1} summary to memory, of length {len(summary)} characters"
+            f"Summarized chunk {i + 1}, summary of length {len(summary)} characters"
         )
 
-        memory_to_add = f"Source: {url}\n" f"Content summary part#{i + 1}: {summary}"
-
-        memory.add(memory_to_add)
-
     logger.info(f"Summarized {len(chunks)} chunks.")
+    memory.add_many(
+        [
+            f"Source: {url}\n" f"Content summary part#{i + 1}: {summary}"
+            for i, summary in enumerate(summaries)
+        ]
+    )
 
     combined_summary = "\n".join(summaries)
     messages = [create_message(combined_summary, question)]
@@ -134,9 +213,158 @@ def summarize_text(
     return create_chat_completion(
         model=model,
         messages=messages,
+        priority=Priority.LOW,
     )
 
 
+def filters_chunks(question: str) -> bool:
+    """Whether the chunks of a page are filtered by their similarity to the
+    question"""
+    return bool(question) and (
+        CFG.browse_relevant_chunks > 0 or CFG.browse_relevance_threshold > -1
+    )
+
+
+def select_relevant_chunks(
+    chunks: List[str], question: str, embeddings: Optional[np.ndarray]
+) -> List[str]:
+    """Select the chunks most similar to the question, to only summarize those
+
+    Chunks less similar than BROWSE_RELEVANCE_THRESHOLD are skipped, and at most
+    BROWSE_RELEVANT_CHUNKS of the most similar ones are selected, but always at
+    least the most similar one.
+
+    Args:
+        chunks (List[str]): The chunks of text
+        question (str): The question to ask the model
+        embeddings (np.ndarray): The embeddings of the chunks followed by the
+            embedding of the question, needed if `filters_chunks(question)`
+
+    Returns:
+        List[str]: The selected chunks, in their order in the text
+    """
+    if not filters_chunks(question):
+        return chunks
+
+    similarities = embeddings[:-1] @ embeddings[-1]
+    ranked = np.argsort(-similarities)
+    selected = [i for i in ranked if similarities[i] >= CFG.browse_relevance_threshold]
+    if CFG.browse_relevant_chunks > 0:
+        selected = selected[: CFG.browse_relevant_chunks]
+    selected = selected or [ranked[0]]
+    logger.info(f"Selected {len(selected)} of {len(chunks)} chunks for the question")
+    return [chunks[i] for i in sorted(selected)]
+
+
+def pack_summaries(
+    summaries: List[str], question: str, model: str, max_length: int
+) -> List[List[str]]:
+    """Group consecutive summaries so that each group fits in one message
+
+    Args:
+        summaries (List[str]): The summaries to group
+        question (str): The question the summaries are combined for
+        model (str): The model to count tokens for
+        max_length (int): The maximum number of tokens of a message
+
+    Returns:
+        List[List[str]]: The groups, each with at least one summary
+    """
+    message_tokens = count_message_tokens([create_message("", question)], model) + 1
+    groups: List[List[str]] = [[]]
+    tokens = message_tokens
+    for summary in summaries:
+        summary_tokens = count_string_tokens("\n" + summary, model)
+        if groups[-1] and tokens + summary_tokens > max_length:
+            groups.append([])
+            tokens = message_tokens
+        groups[-1].append(summary)
+        tokens += summary_tokens
+    return groups
+
+
+def truncate_summary(summary: str, model: str, max_tokens: int) -> str:
+    """Cut a summary between words so that it fits in `max_tokens` tokens
+
+    Args:
+        summary (str): The summary to cut
+        model (str): The model to count tokens for
+        max_tokens (int): The maximum number of tokens of the summary, counted
+            with the newline that joins it to others
+
+    Returns:
+        str: The longest prefix of whole words that fits, or the summary itself
+    """
+    words = summary.split(" ")
+    # binary search the number of words that fit
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_string_tokens("\n" + " ".join(words[:middle]), model) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+def map_reduce_summaries(
+    chunks: List[str], question: str, model: str
+) -> Tuple[List[str], str]:
+    """Summarize chunks concurrently, then combine the summaries in a tree
+
+    Groups of summaries that fit in BROWSE_CHUNK_MAX_LENGTH are summarized again
+    until all of them fit in the message of the final summary. When no two
+    summaries fit in one message, each is cut to half of it first. Like the
+    sequential path, this uses plugins that handle chat completions and the
+    response cache.
+
+    Args:
+        chunks (List[str]): The chunks of text to summarize
+        question (str): The question to ask the model
+        model (str): The model to use
+
+    Returns:
+        Tuple[List[str], str]: The summaries of the chunks, and the final summary
+    """
+    workers = asyncio.Semaphore(CFG.browse_summary_workers)
+
+    async def summarize(text: str) -> str:
+        async with workers:
+            return await acreate_chat_completion(
+                [create_message(text, question)], model, priority=Priority.LOW
+            )
+
+    async def summarize_all(texts: List[str]) -> List[str]:
+        return await asyncio.gather(*[summarize(text) for text in texts])
+
+    max_length = CFG.browse_chunk_max_length
+    message_tokens = count_message_tokens([create_message("", question)], model) + 1
+
+    async def map_reduce() -> Tuple[List[str], str]:
+        logger.info(f"Summarizing {len(chunks)} chunks concurrently")
+        summaries = await summarize_all(chunks)
+        level = summaries
+        groups = pack_summaries(level, question, model, max_length)
+        while len(groups) > 1:
+            if len(groups) == len(level):
+                # no two summaries fit in one message, so any two will after this
+                logger.info(f"Truncating {len(level)} summaries to combine them")
+                share = (max_length - message_tokens) // 2
+                truncated = [
+                    truncate_summary(summary, model, share) for summary in level
+                ]
+                if truncated == level:
+                    break  # the message leaves no room for summaries
+                level = truncated
+            else:
+                logger.info(f"Combining {len(level)} summaries into {len(groups)}")
+                level = await summarize_all(["\n".join(group) for group in groups])
+            groups = pack_summaries(level, question, model, max_length)
+        return summaries, await summarize("\n".join(level))
+
+    return run_concurrently([map_reduce()])[0]
+
+
 def scroll_to_percentage(driver: WebDriver, ratio: float) -> None:
     """Scroll to a percentage of the page
 
@@ -1,12 +1,19 @@
 # sourcery skip: snake-case-functions
 """Tests for LocalCache class"""
-import unittest
+import threading
 
-import orjson
+import numpy as np
 import pytest
 
-from autogpt.memory.local import EMBED_DIM, SAVE_OPTIONS
+from autogpt.memory.local import (
+    EMBED_DIM,
+    OFFSET_DTYPE,
+    TEXT_LENGTH,
+    VECTOR_SIZE,
+    CacheFiles,
+)
 from autogpt.memory.local import LocalCache as LocalCache_
+from autogpt.memory.local import fcntl, top_k_indices
 from tests.utils import requires_api_key
 
 
@@ -24,40 +31,32 @@ def mock_embed_with_ada(mocker):
         "autogpt.memory.local.get_ada_embedding",
         return_value=[0.1] * EMBED_DIM,
     )
+    mocker.patch(
+        "autogpt.memory.local.get_ada_embeddings",
+        side_effect=lambda texts: [[0.1] * EMBED_DIM for _ in texts],
+    )
 
 
-def test_init_without_backing_file(LocalCache, config, workspace):
-    cache_file = workspace.root / f"{config.memory_index}.json"
-
-    assert not cache_file.exists()
-    LocalCache(config)
-    assert cache_file.exists()
-    assert cache_file.read_text() == "{}"
-
-
-def test_init_with_backing_empty_file(LocalCache, config, workspace):
-    cache_file = workspace.root / f"{config.memory_index}.json"
-    cache_file.touch()
+def test_init_without_backing_files(LocalCache, config, workspace):
+    vectors_file = workspace.root / f"{config.memory_index}.vectors"
+    texts_file = workspace.root / f"{config.memory_index}.texts"
 
-    assert cache_file.exists()
+    assert not vectors_file.exists()
+    assert not texts_file.exists()
     LocalCache(config)
-    assert cache_file.exists()
-    assert cache_file.read_text() == "{}"
+    assert vectors_file.read_bytes() == b""
+    assert texts_file.read_bytes() == b""
 
 
-def test_init_with_backing_file(LocalCache, config, workspace):
-    cache_file = workspace.root / f"{config.memory_index}.json"
-    cache_file.touch()
+def test_init_with_backing_files(LocalCache, config, workspace):
+    vectors_file = workspace.root / f"{config.memory_index}.vectors"
+    texts_file = workspace.root / f"{config.memory_index}.texts"
+    vectors_file.write_bytes(b"\0" * VECTOR_SIZE)
+    texts_file.write_bytes(TEXT_LENGTH.pack(4) + b"test")
 
-    raw_data = {"texts": ["test"]}
-    data = orjson.dumps(raw_data, option=SAVE_OPTIONS)
-    with cache_file.open("wb") as f:
-        f.write(data)
-
-    assert cache_file.exists()
     LocalCache(config)
-    assert cache_file.exists()
-    assert cache_file.read_text() == "{}"
+    assert vectors_file.read_bytes() == b""
+    assert texts_file.read_bytes() == b""
 
 
 def test_add(LocalCache, config, mock_embed_with_ada):
@@ -108,3 +107,278 @@ def test_get_stats(LocalCache, config, mock_embed_with_ada) -> None:
     cache.add(text)
     stats = cache.get_stats()
     assert stats == (1, cache.data.embeddings.shape)
+
+
+def test_add_many(LocalCache, config, mock_embed_with_ada) -> None:
+    cache = LocalCache(config)
+    texts = ["text 1", "Command Error: failed", "text 2"]
+
+    added = cache.add_many(texts)
+    assert added == ["text 1", "text 2"]
+    assert cache.data.texts == ["text 1", "text 2"]
+    assert cache.data.embeddings.shape == (2, EMBED_DIM)
+
+
+def test_add_many_with_embeddings(LocalCache, config, mocker) -> None:
+    embed = mocker.patch("autogpt.memory.local.get_ada_embeddings")
+    cache = LocalCache(config)
+    embeddings = np.eye(3, EMBED_DIM)
+
+    cache.add_many(["text 1", "Command Error: failed", "text 2"], embeddings)
+
+    embed.assert_not_called()
+    assert np.array_equal(cache.data.embeddings, embeddings[[0, 2]])
+
+
+def test_add_grows_buffer_geometrically(LocalCache, config, mock_embed_with_ada):
+    cache = LocalCache(config)
+    for i in range(5):
+        cache.add(f"text {i}")
+
+    assert cache.data.size == 5
+    assert cache.data.embeddings.shape == (5, EMBED_DIM)
+    assert len(cache.data.buffer) == 8
+
+
+def test_add_appends_to_backing_files(
+    LocalCache, config, workspace, mock_embed_with_ada
+):
+    cache = LocalCache(config)
+    cache.add("test")
+    cache.add_many(["text 1", "text 2"])
+
+    vectors_file = workspace.root / f"{config.memory_index}.vectors"
+    texts_file = workspace.root / f"{config.memory_index}.texts"
+    vectors = np.fromfile(vectors_file, dtype=np.float32).reshape(-1, EMBED_DIM)
+    assert np.array_equal(vectors, cache.data.embeddings)
+    assert texts_file.read_bytes() == b"".join(
+        TEXT_LENGTH.pack(len(text)) + text.encode()
+        for text in ["test", "text 1", "text 2"]
+    )
+
+
+def test_clear_truncates_backing_files(
+    LocalCache, config, workspace, mock_embed_with_ada
+):
+    cache = LocalCache(config)
+    cache.add("test")
+    cache.clear()
+
+    assert (workspace.root / f"{config.memory_index}.vectors").read_bytes() == b""
+    assert (workspace.root / f"{config.memory_index}.texts").read_bytes() == b""
+
+
+def test_compact_drops_partial_entries(workspace):
+    files = CacheFiles(workspace.root, "test-cache")
+    files.append(["text 1", "text 2"], np.ones((2, EMBED_DIM), dtype=np.float32))
+
+    # Simulate a write that was interrupted after the vector was written
+    files.vectors_file.write(b"\0" * VECTOR_SIZE)
+    files.texts_file.write(TEXT_LENGTH.pack(100) + b"partial")
+    files.texts_file.flush()
+    files.vectors_file.flush()
+
+    assert files.compact() == 2
+    assert files.vectors_path.stat().st_size == 2 * VECTOR_SIZE
+    assert files.texts_path.read_bytes() == b"".join(
+        TEXT_LENGTH.pack(len(text)) + text.encode() for text in ["text 1", "text 2"]
+    )
+
+
+def test_processes_append_to_the_same_files(workspace):
+    first = CacheFiles(workspace.root, "test-cache")
+    second = CacheFiles(workspace.root, "test-cache")
+
+    first.append(["text 1"], np.ones((1, EMBED_DIM), dtype=np.float32))
+    second.append(["text 2"], np.ones((1, EMBED_DIM), dtype=np.float32))
+    first.append(["text 3"], np.ones((1, EMBED_DIM), dtype=np.float32))
+
+    assert CacheFiles(workspace.root, "test-cache").load().texts == [
+        "text 1",
+        "text 2",
+        "text 3",
+    ]
+
+
+@pytest.mark.skipif(fcntl is None, reason="no advisory file locks")
+def test_compact_waits_for_appends_in_other_processes(workspace):
+    writer = CacheFiles(workspace.root, "test-cache")
+    writer.append(["text 1"], np.ones((1, EMBED_DIM), dtype=np.float32))
+    compacted = []
+
+    with writer.locked():
+        # an entry is being written while another process opens the files
+        writer.vectors_file.write(b"\0" * VECTOR_SIZE)
+        writer.vectors_file.flush()
+        reader = threading.Thread(
+            target=lambda: compacted.append(
+                CacheFiles(workspace.root, "test-cache").compact()
+            )
+        )
+        reader.start()
+        reader.join(timeout=0.2)
+        assert reader.is_alive()
+        writer.texts_file.write(TEXT_LENGTH.pack(6) + b"text 2")
+        writer.texts_file.flush()
+        writer.offsets_file.write(np.array([20], dtype=OFFSET_DTYPE).tobytes())
+        writer.offsets_file.flush()
+    reader.join(timeout=5)
+
+    assert compacted == [2]
+
+
+def test_init_persistent_reloads_backing_files(
+    LocalCache, config, mocker, mock_embed_with_ada
+):
+    cache = LocalCache(config)
+    cache.add_many(["text 1", "text 2"])
+    embeddings = cache.data.embeddings.copy()
+
+    mocker.patch.object(config, "local_cache_persist", True)
+    del LocalCache._instances[LocalCache]
+    cache = LocalCache(config)
+
+    assert isinstance(cache.data.buffer, np.memmap)
+    assert cache.data.texts == ["text 1", "text 2"]
+    assert np.array_equal(cache.data.embeddings, embeddings)
+
+    cache.add("text 3")
+    assert cache.data.texts == ["text 1", "text 2", "text 3"]
+    assert cache.data.embeddings.shape == (3, EMBED_DIM)
+
+
+def test_compact_rebuilds_missing_offsets(workspace):
+    files = CacheFiles(workspace.root, "test-cache")
+    files.append(["text 1", "text 2"], np.ones((2, EMBED_DIM), dtype=np.float32))
+    files.offsets_file.truncate(0)
+
+    assert files.compact() == 2
+    content = files.load()
+    assert content.texts == ["text 1", "text 2"]
+    assert content.texts[-1] == "text 2"
+
+
+def test_get_relevant_many(LocalCache, config, mocker) -> None:
+    def embed(texts):
+        vectors = np.zeros((len(texts), EMBED_DIM))
+        for i, text in enumerate(texts):
+            vectors[i, int(text[-1])] = 1.0
+            vectors[i, 0] = 0.5
+        return vectors.tolist()
+
+    mocker.patch("autogpt.memory.local.get_ada_embeddings", side_effect=embed)
+    cache = LocalCache(config)
+    cache.add_many(["text 1", "text 2", "text 3"])
+
+    results = cache.get_relevant_many(["query 2", "query 3"], 2)
+    assert [[text for text, _ in result] for result in results] == [
+        ["text 2", "text 1"],
+        ["text 3", "text 1"],
+    ]
+    assert results[0][0][1] == pytest.approx(1.25)
+    assert results[0][1][1] == pytest.approx(0.25)
+
+
+@pytest.fixture
+def mock_embed_randomly(mocker):
+    rng = np.random.default_rng(42)
+
+    def embed(texts):
+        vectors = rng.normal(size=(len(texts), EMBED_DIM))
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+
+    mocker.patch("autogpt.memory.local.get_ada_embeddings", side_effect=embed)
+
+
+def test_ivf_index_matches_brute_force_when_probing_all_lists(
+    LocalCache, config, mocker, mock_embed_randomly
+):
+    mocker.patch.multiple(
+        config,
+        local_cache_index="ivf",
+        local_cache_ivf_nlist=4,
+        local_cache_ivf_nprobe=4,
+    )
+    cache = LocalCache(config)
+    cache.add_many([f"text {i}" for i in range(100)])
+    assert cache.index.trained
+    assert sum(len(ivf_list) for ivf_list in cache.index.lists) == 100
+
+    queries = cache.data.embeddings[:3]
+    for (indices, scores), query in zip(cache._search(queries, 5), queries):
+        expected = top_k_indices(cache.data.embeddings @ query, 5)
+        assert indices.tolist() == expected.tolist()
+        assert indices[0] == np.argmax(cache.data.embeddings @ query)
+
+
+def test_ivf_index_is_persisted(LocalCache, config, mocker, mock_embed_randomly):
+    mocker.patch.multiple(
+        config,
+        local_cache_index="ivf",
+        local_cache_ivf_nlist=4,
+        local_cache_ivf_nprobe=1,
+    )
+    cache = LocalCache(config)
+    cache.add_many([f"text {i}" for i in range(80)])
+    cache.add_many([f"text {i}" for i in range(80, 100)])
+    lists = cache.index.lists
+
+    mocker.patch.object(config, "local_cache_persist", True)
+    del LocalCache._instances[LocalCache]
+    cache = LocalCache(config)
+
+    assert cache.index.trained
+    assert cache.index.lists == lists
+
+
+def test_ivf_index_is_retrained_when_nlist_changes(
+    LocalCache, config, mocker, mock_embed_randomly
+):
+    mocker.patch.multiple(
+        config,
+        local_cache_index="ivf",
+        local_cache_ivf_nlist=8,
+        local_cache_ivf_nprobe=1,
+        local_cache_persist=True,
+    )
+    LocalCache(config).add_many([f"text {i}" for i in range(200)])
+
+    mocker.patch.object(config, "local_cache_ivf_nlist", 4)
+    del LocalCache._instances[LocalCache]
+    cache = LocalCache(config)
+
+    assert len(cache.index.centroids) == 4
+    assert sum(len(ivf_list) for ivf_list in cache.index.lists) == 200
+    cache.add_many(["text 200"])
+    assert sum(len(ivf_list) for ivf_list in cache.index.lists) == 201
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_search_reranks_in_full_precision(
+    LocalCache, config, mocker, mock_embed_randomly, dtype
+):
+    mocker.patch.object(config, "local_cache_dtype", dtype)
+    cache = LocalCache(config)
+    cache.add_many([f"text {i}" for i in range(100)])
+    assert cache.data.embeddings.dtype == dtype
+
+    vectors = np.fromfile(
+        config.workspace_path / f"{config.memory_index}.vectors", dtype=np.float32
+    ).reshape(-1, EMBED_DIM)
+    queries = vectors[:3] + 0.1 * vectors[3:6]
+    for (indices, scores), query in zip(cache._search(queries, 5), queries):
+        exact_scores = vectors @ query
+        assert indices.tolist() == top_k_indices(exact_scores, 5).tolist()
+        assert scores == pytest.approx(exact_scores[indices])
+
+
+def test_quantized_cache_reloads(LocalCache, config, mocker, mock_embed_randomly):
+    mocker.patch.multiple(config, local_cache_dtype="int8", local_cache_persist=True)
+    cache = LocalCache(config)
+    cache.add_many(["text 1", "text 2"])
+    embeddings = cache.data.decode(slice(0, 2))
+
+    del LocalCache._instances[LocalCache]
+    cache = LocalCache(config)
+    assert cache.data.texts == ["text 1", "text 2"]
+    assert np.array_equal(cache.data.decode(slice(0, 2)), embeddings)
@@ -75,7 +75,7 @@ class TestWeaviateMemory(unittest.TestCase):
                 uuid=get_valid_uuid(uuid4()),
                 data_object={"raw_text": doc},
                 class_name=self.index,
-                vector=get_ada_embedding(doc),
+                vector=get_ada_embedding(doc).tolist(),
             )
 
             batch.flush()
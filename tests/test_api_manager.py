@@ -86,6 +86,30 @@ class TestApiManager:
             assert api_manager.get_total_completion_tokens() == 20
             assert api_manager.get_total_cost() == (10 * 0.002 + 20 * 0.002) / 1000
 
+    @staticmethod
+    def test_create_chat_completion_stream():
+        """Test if streaming yields the content pieces and updates the cost after."""
+        messages = [{"role": "user", "content": "Who won the world series in 2020?"}]
+        model = "gpt-3.5-turbo"
+        chunks = [
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "The Los Angeles"}}]},
+            {"choices": [{"delta": {"content": " Dodgers"}}]},
+            {"choices": [{"delta": {}}]},
+        ]
+
+        with patch("openai.ChatCompletion.create", return_value=iter(chunks)), patch(
+            "autogpt.llm.api_manager.count_message_tokens", return_value=10
+        ), patch("autogpt.llm.api_manager.count_string_tokens", return_value=4):
+            pieces = api_manager.create_chat_completion(
+                messages, model=model, stream=True
+            )
+            assert api_manager.get_total_prompt_tokens() == 0
+
+            assert list(pieces) == ["The Los Angeles", " Dodgers"]
+            assert api_manager.get_total_prompt_tokens() == 10
+            assert api_manager.get_total_completion_tokens() == 4
+
     def test_getter_methods(self):
         """Test the getter methods for total tokens, cost, and budget."""
         api_manager.update_cost(60, 120, "gpt-3.5-turbo")
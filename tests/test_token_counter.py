@@ -1,6 +1,28 @@
 import pytest
 
-from autogpt.llm import count_message_tokens, count_string_tokens
+from autogpt.llm import count_message_tokens, count_string_tokens, token_counter
+from autogpt.llm.token_counter import (
+    TokenLedger,
+    clear_token_counts,
+    count_text_tokens,
+    get_encoding,
+)
+
+
+@pytest.fixture
+def word_encoding(mocker):
+    """An encoding with one token per word, so no encoding files are needed."""
+    encoding = mocker.Mock()
+    encoding.name = "words"
+    encoding.encode.side_effect = str.split
+    tiktoken = mocker.patch("autogpt.llm.token_counter.tiktoken")
+    tiktoken.encoding_for_model.return_value = encoding
+    tiktoken.get_encoding.return_value = encoding
+    get_encoding.cache_clear()
+    clear_token_counts()
+    yield encoding
+    get_encoding.cache_clear()
+    clear_token_counts()
 
 
 def test_count_message_tokens():
@@ -70,3 +92,59 @@ def test_count_string_tokens_gpt_4():
 
     string = "Hello, world!"
     assert count_string_tokens(string, model_name="gpt-4-0314") == 4
+
+
+def test_encoding_is_loaded_once(word_encoding):
+    count_string_tokens("one two", model_name="gpt-4")
+    count_string_tokens("three", model_name="gpt-4")
+
+    assert get_encoding("gpt-4") is word_encoding
+    assert get_encoding.cache_info().misses == 1
+
+
+def test_message_token_counts_are_memoized(word_encoding):
+    messages = [{"role": "user", "content": "a long message " * 10}]
+
+    first = count_message_tokens(messages, model="gpt-4")
+    encoded = word_encoding.encode.call_count
+    assert count_message_tokens(messages, model="gpt-4") == first
+    assert word_encoding.encode.call_count == encoded
+
+
+def test_token_count_cache_is_keyed_by_digest(word_encoding, mocker):
+    mocker.patch("autogpt.llm.token_counter.TOKEN_COUNT_CACHE_SIZE", 2)
+    text = "word " * 10000
+
+    assert count_text_tokens(text, "words") == 10000
+    assert count_text_tokens(text, "words") == 10000
+    assert word_encoding.encode.call_count == 1
+    assert all(len(digest) == 32 for digest, _ in token_counter._token_counts)
+
+    count_text_tokens("one", "words")
+    count_text_tokens("two", "words")
+    assert len(token_counter._token_counts) == 2
+
+
+def test_count_string_tokens_stops_at_the_limit(word_encoding):
+    string = "word " * 10000
+
+    assert count_string_tokens(string, model_name="gpt-4", limit=10) > 10
+    assert max(len(call.args[0]) for call in word_encoding.encode.call_args_list) < 100
+    assert count_string_tokens("just three words", "gpt-4", limit=10) == 3
+
+
+def test_token_ledger_selects_the_most_recent_messages(word_encoding, mocker):
+    count = mocker.patch(
+        "autogpt.llm.token_counter.count_message_tokens",
+        side_effect=lambda messages, model: len(messages[0]["content"].split()),
+    )
+    history = [{"role": "user", "content": "word " * n} for n in (5, 3, 4, 2)]
+    ledger = TokenLedger()
+
+    assert ledger.select_window(history, "gpt-4", 8) == (2, 6)
+    assert ledger.select_window(history, "gpt-4", 100) == (0, 14)
+    assert ledger.select_window(history, "gpt-4", 1) == (4, 0)
+
+    history.append({"role": "user", "content": "word"})
+    assert ledger.select_window(history, "gpt-4", 3) == (3, 3)
+    assert count.call_count == 5
@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+import pytest
+
+from autogpt.llm.embedding_batcher import EmbeddingBatcher
+
+
+@pytest.fixture
+def batcher():
+    EmbeddingBatcher._instances.pop(EmbeddingBatcher, None)
+    yield EmbeddingBatcher(window=1.0, max_texts=4)
+    EmbeddingBatcher._instances.pop(EmbeddingBatcher, None)
+
+
+def embed_lengths(texts, **_):
+    return np.array([[len(text)] for text in texts], dtype=np.float32)
+
+
+def embed_concurrently(batcher, embed, text_lists, **kwargs):
+    results = [None] * len(text_lists)
+
+    def run(i):
+        results[i] = batcher.embed(embed, text_lists[i], **kwargs)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(text_lists))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_concurrent_calls_share_one_request(batcher, mocker):
+    embed = mocker.Mock(side_effect=embed_lengths)
+
+    results = embed_concurrently(batcher, embed, [["a", "bb"], ["ccc"], ["dddd"]])
+
+    embed.assert_called_once()
+    assert sorted(embed.call_args.args[0]) == ["a", "bb", "ccc", "dddd"]
+    assert [result.tolist() for result in results] == [[[1], [2]], [[3]], [[4]]]
+
+
+def test_batch_is_sent_before_the_window_when_full(batcher, mocker):
+    batcher.window = 60
+    embed = mocker.Mock(side_effect=embed_lengths)
+
+    result = batcher.embed(embed, ["a", "b", "c", "d", "e"])
+
+    embed.assert_called_once()
+    assert result.tolist() == [[1]] * 5
+
+
+def test_errors_are_raised_in_every_caller(batcher, mocker):
+    # the batch is only sent once all three callers joined it
+    batcher.window = 60
+    batcher.max_texts = 3
+    embed = mocker.Mock(side_effect=RuntimeError("API down"))
+    started = threading.Barrier(3)
+    errors = [None] * 3
+
+    def run(i):
+        started.wait(timeout=5)
+        try:
+            batcher.embed(embed, [f"text {i}"])
+        except RuntimeError as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    embed.assert_called_once()
+    assert all(str(error) == "API down" for error in errors)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from autogpt.llm import llm_utils
+from autogpt.llm.embedding_cache import EmbeddingCache
+
+
+@pytest.fixture
+def embedding_cache(tmp_path):
+    if EmbeddingCache in EmbeddingCache._instances:
+        del EmbeddingCache._instances[EmbeddingCache]
+    yield EmbeddingCache(tmp_path / "embeddings.sqlite3", max_entries=2)
+    del EmbeddingCache._instances[EmbeddingCache]
+
+
+def test_get_many_returns_none_for_misses(embedding_cache):
+    embedding_cache.put_many("ada", ["text 1"], [[0.5, 1.0]])
+
+    hit, miss = embedding_cache.get_many("ada", ["text 1", "text 2"])
+    assert hit.tolist() == [0.5, 1.0]
+    assert miss is None
+    assert embedding_cache.get_many("other", ["text 1"]) == [None]
+    assert embedding_cache.get_stats() == {"hits": 1, "misses": 2}
+
+
+def test_put_many_evicts_least_recently_used(embedding_cache, mocker):
+    clock = mocker.patch("autogpt.llm.embedding_cache.time.time")
+    clock.return_value = 1
+    embedding_cache.put_many("ada", ["text 1", "text 2"], [[1.0], [2.0]])
+    clock.return_value = 2
+    embedding_cache.get_many("ada", ["text 1"])
+    clock.return_value = 3
+    embedding_cache.put_many("ada", ["text 3"], [[3.0]])
+
+    first, second, third = embedding_cache.get_many(
+        "ada", ["text 1", "text 2", "text 3"]
+    )
+    assert first.tolist() == [1.0]
+    assert second is None
+    assert third.tolist() == [3.0]
+
+
+def test_cache_is_shared_between_connections(embedding_cache):
+    embedding_cache.put_many("ada", ["text"], [[1.0]])
+
+    other = EmbeddingCache.__new__(EmbeddingCache)
+    other.__init__(embedding_cache.path, max_entries=2)
+    (embedding,) = other.get_many("ada", ["text"])
+    assert embedding.tolist() == [1.0]
+
+
+def test_get_ada_embeddings_only_embeds_misses(config, embedding_cache, mocker):
+    mocker.patch.object(config, "embedding_cache", True)
+    embedding_cache.put_many(config.embedding_model, ["cached text"], [[1.0]])
+    create_embeddings = mocker.patch.object(
+        llm_utils, "create_embeddings", return_value=np.array([[2.0]], dtype=np.float32)
+    )
+
+    embeddings = llm_utils.get_ada_embeddings(["cached text", "new\ntext"])
+
+    assert embeddings.tolist() == [[1.0], [2.0]]
+    create_embeddings.assert_called_once_with(
+        ["new text"], model=config.embedding_model
+    )
+    (embedding,) = embedding_cache.get_many(config.embedding_model, ["new text"])
+    assert embedding.tolist() == [2.0]
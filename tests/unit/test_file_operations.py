@@ -164,6 +164,21 @@ def test_read_file(test_file_with_content_path: Path, file_content):
     assert content == file_content
 
 
+def test_ingest_file_adds_all_chunks_at_once(
+    test_file_with_content_path: Path, mocker: MockerFixture
+):
+    memory = mocker.Mock()
+    file_ops.ingest_file(
+        str(test_file_with_content_path), memory, max_length=10, overlap=0
+    )
+
+    memory.add.assert_not_called()
+    memory.add_many.assert_called_once()
+    (chunks,) = memory.add_many.call_args.args
+    assert len(chunks) == 3
+    assert chunks[0].endswith("Content part#1/3: This is a")
+
+
 def test_write_to_file(test_file_path: Path):
     new_content = "This is new content.\n"
     file_ops.write_to_file(str(test_file_path), new_content)
@@ -0,0 +1,67 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from autogpt.processing.html import extract_text, link_density
+
+ARTICLE = (
+    "Barrel rolls are performed by rotating the aircraft a full turn around its "
+    "longitudinal axis, while keeping the nose pointed along a helical path. "
+)
+
+PAGE = f"""
+<html><body>
+<nav><a href="/">Home</a> <a href="/docs">Docs</a> <a href="/blog">Blog</a></nav>
+<div id="cookie-banner">We use cookies, to improve your experience, accept them.</div>
+<div class="layout">
+  <div class="sidebar">
+    <p><a href="/a">Related article one about something else entirely</a></p>
+    <p><a href="/b">Related article two about something else entirely</a></p>
+  </div>
+  <div class="article-body">
+    <h1>How to do a barrel roll</h1>
+    <p>{ARTICLE}</p>
+    <p>{ARTICLE}</p>
+    <p>{ARTICLE}</p>
+  </div>
+</div>
+<footer>Copyright, all rights reserved, terms and conditions apply.</footer>
+</body></html>
+"""
+
+
+def test_main_content_only_keeps_the_article():
+    text = extract_text(PAGE, main_content_only=True)
+
+    assert "How to do a barrel roll" in text
+    assert text.count("Barrel rolls are performed") == 3
+    for boilerplate in ("Home", "cookies", "Related article", "Copyright"):
+        assert boilerplate not in text
+
+
+def test_raw_mode_keeps_all_text():
+    text = extract_text(PAGE)
+
+    for boilerplate in ("Home", "cookies", "Related article", "Copyright"):
+        assert boilerplate in text
+
+
+def test_pages_wrapped_in_a_form_keep_their_content():
+    html = PAGE.replace("<body>", "<body><form id='aspnetForm'>").replace(
+        "</body>", "</form></body>"
+    )
+
+    assert extract_text(html, main_content_only=True) == extract_text(
+        PAGE, main_content_only=True
+    )
+
+
+def test_short_pages_fall_back_to_all_text():
+    html = "<html><body><nav>Menu</nav><p>This is <b>bold</b> text.</p></body></html>"
+
+    assert extract_text(html, main_content_only=True) == extract_text(html)
+
+
+def test_link_density():
+    soup = BeautifulSoup("<p>four <a href='/'>link</a></p>", "html.parser")
+
+    assert link_density(soup.p) == pytest.approx(4 / 9)
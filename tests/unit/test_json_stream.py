@@ -0,0 +1,42 @@
+from autogpt.json_utils.json_stream import JsonObjectStream
+
+REPLY = (
+    'Sure!\n{"thoughts": {"text": "a \\"quoted\\" } brace", "plan": ["- x", "- y"]},'
+    ' "command": {"name": "google", "args": {"input": "weather"}}}'
+)
+
+
+def feed_in_pieces(stream, text, size):
+    members = []
+    for start in range(0, len(text), size):
+        members.append(stream.feed(text[start : start + size]))
+    return members
+
+
+def test_members_are_reported_once_complete():
+    stream = JsonObjectStream()
+    thoughts_end = REPLY.index("]}") + 2
+
+    assert stream.feed(REPLY[: thoughts_end - 1]) == []
+    assert stream.feed(REPLY[thoughts_end - 1 : thoughts_end]) == [
+        ("thoughts", {"text": 'a "quoted" } brace', "plan": ["- x", "- y"]})
+    ]
+    assert stream.feed(REPLY[thoughts_end:]) == [
+        ("command", {"name": "google", "args": {"input": "weather"}})
+    ]
+
+
+def test_any_split_yields_every_member_once():
+    for size in range(1, 12):
+        stream = JsonObjectStream()
+        members = [m for ms in feed_in_pieces(stream, REPLY, size) for m in ms]
+        assert [key for key, _ in members] == ["thoughts", "command"]
+
+
+def test_scalar_members_are_reported_at_the_next_comma():
+    stream = JsonObjectStream()
+
+    assert stream.feed('{"a": 1') == []
+    assert stream.feed(', "b": "x"') == [("a", 1)]
+    assert stream.feed("}") == [("b", "x")]
+    assert stream.feed(" trailing text") == []
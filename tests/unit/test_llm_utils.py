@@ -1,7 +1,16 @@
+import numpy as np
 import pytest
 from openai.error import APIError, RateLimitError
 
 from autogpt.llm import llm_utils
+from autogpt.llm.retry import circuit_breaker
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breaker():
+    circuit_breaker.reset()
+    yield
+    circuit_breaker.reset()
 
 
 @pytest.fixture(params=[RateLimitError, APIError])
@@ -131,3 +140,66 @@ def test_chunked_tokens():
     ]
     output = list(llm_utils.chunked_tokens(text, "cl100k_base", 8191))
     assert output == expected_output
+
+
+def test_create_embeddings_single_request(mocker):
+    mocker.patch.object(
+        llm_utils,
+        "chunked_tokens",
+        side_effect=lambda text, **_: [
+            tuple(range(len(word))) for word in text.split()
+        ],
+    )
+    response = mocker.MagicMock()
+    response.usage.prompt_tokens = 6
+    response.__getitem__.return_value = [
+        {"index": 2, "embedding": [0.0, 1.0]},
+        {"index": 0, "embedding": [1.0, 0.0]},
+        {"index": 1, "embedding": [0.0, 1.0]},
+    ]
+    create = mocker.patch("openai.Embedding.create", return_value=response)
+    mocker.patch.object(llm_utils.ApiManager(), "update_cost")
+
+    embeddings = llm_utils.create_embeddings(["a bbb", "cc"], model="ada")
+
+    create.assert_called_once()
+    assert create.call_args.kwargs["input"] == [(0,), (0, 1, 2), (0, 1)]
+    assert embeddings[0] == pytest.approx([0.316227766, 0.948683298])
+    assert embeddings[1] == pytest.approx([0.0, 1.0])
+
+
+def test_create_embeddings_splits_large_batches(mocker):
+    mocker.patch.object(llm_utils, "EMBEDDING_BATCH_SIZE", 2)
+    mocker.patch.object(
+        llm_utils, "chunked_tokens", side_effect=lambda text, **_: [(0,), (1,)]
+    )
+    embed_chunks = mocker.patch.object(
+        llm_utils,
+        "embed_chunks",
+        side_effect=lambda chunks, **_: np.ones((len(chunks), 2), np.float32),
+    )
+
+    embeddings = llm_utils.create_embeddings(["a", "b", "c"], model="ada")
+
+    assert embed_chunks.call_count == 3
+    assert isinstance(embeddings, np.ndarray)
+    assert embeddings.shape == (3, 2)
+    assert embeddings == pytest.approx(np.full((3, 2), 2**-0.5))
+
+
+def test_create_chat_completion_streams_to_on_token(config, mocker):
+    mocker.patch.object(config, "plugins", [])
+    create = mocker.patch.object(
+        llm_utils.ApiManager(),
+        "create_chat_completion",
+        return_value=iter(['{"a":', " 1}"]),
+    )
+    pieces = []
+
+    reply = llm_utils.create_chat_completion(
+        [{"role": "user", "content": "Hi"}], "gpt-4", on_token=pieces.append
+    )
+
+    assert reply == '{"a": 1}'
+    assert pieces == ['{"a":', " 1}"]
+    assert create.call_args.kwargs["stream"] is True
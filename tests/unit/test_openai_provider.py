@@ -0,0 +1,125 @@
+import asyncio
+
+import numpy as np
+import openai
+import pytest
+
+from autogpt.llm import ApiManager
+from autogpt.llm.embedding_cache import EmbeddingCache
+from autogpt.llm.providers.openai import (
+    acreate_chat_completion,
+    acreate_embeddings,
+    run_concurrently,
+)
+
+
+@pytest.fixture
+def api_manager(mocker):
+    api_manager = ApiManager()
+    mocker.patch.object(api_manager, "update_cost")
+    return api_manager
+
+
+def test_chat_completions_share_a_session_and_respect_the_limit(
+    config, api_manager, mocker
+):
+    mocker.patch.object(config, "openai_max_concurrency", 2)
+    running = []
+    sessions = set()
+    max_running = 0
+
+    async def acreate(messages, **_):
+        nonlocal max_running
+        running.append(messages)
+        max_running = max(max_running, len(running))
+        sessions.add(id(openai.aiosession.get()))
+        await asyncio.sleep(0.01)
+        running.remove(messages)
+        response = mocker.MagicMock()
+        response.choices[0].message = {"content": messages[0]["content"].upper()}
+        return response
+
+    mocker.patch("openai.ChatCompletion.acreate", side_effect=acreate)
+
+    replies = run_concurrently(
+        acreate_chat_completion([{"role": "user", "content": text}], "gpt-4")
+        for text in ["a", "b", "c", "d", "e"]
+    )
+
+    assert replies == ["A", "B", "C", "D", "E"]
+    assert max_running == 2
+    assert len(sessions) == 1
+    assert api_manager.update_cost.call_count == 5
+
+
+def test_embedding_batches_are_sent_concurrently(config, api_manager, mocker):
+    mocker.patch("autogpt.llm.providers.openai.EMBEDDING_BATCH_SIZE", 1)
+    mocker.patch(
+        "autogpt.llm.llm_utils.chunked_tokens",
+        side_effect=lambda text, **_: [(0,)] * len(text.split()),
+    )
+
+    async def acreate(input, **_):
+        response = mocker.MagicMock()
+        response.__getitem__.return_value = [{"index": 0, "embedding": [3.0, 4.0]}]
+        return response
+
+    acreate_mock = mocker.patch("openai.Embedding.acreate", side_effect=acreate)
+
+    (embeddings,) = run_concurrently([acreate_embeddings(["a b", "c"])])
+
+    assert acreate_mock.call_count == 3
+    assert np.allclose(embeddings, [[0.6, 0.8], [0.6, 0.8]])
+
+
+def test_plugins_handle_async_chat_completions(config, api_manager, mocker):
+    plugin = mocker.Mock()
+    plugin.can_handle_chat_completion.return_value = True
+    plugin.handle_chat_completion.return_value = "from plugin"
+    mocker.patch.object(config, "plugins", [plugin])
+    acreate = mocker.patch("openai.ChatCompletion.acreate")
+
+    (reply,) = run_concurrently(
+        [acreate_chat_completion([{"role": "user", "content": "a"}], "gpt-4")]
+    )
+
+    assert reply == "from plugin"
+    acreate.assert_not_called()
+
+
+def test_no_texts_give_no_embeddings():
+    (embeddings,) = run_concurrently([acreate_embeddings([])])
+
+    assert embeddings.shape == (0, 1536)
+
+
+@pytest.fixture
+def embedding_cache(config, tmp_path, mocker):
+    mocker.patch.object(config, "embedding_cache", True)
+    EmbeddingCache._instances.pop(EmbeddingCache, None)
+    yield EmbeddingCache(tmp_path / "embeddings.sqlite3", max_entries=10)
+    EmbeddingCache._instances.pop(EmbeddingCache, None)
+
+
+def test_cached_embeddings_are_not_requested_again(
+    config, api_manager, embedding_cache, mocker
+):
+    embedding_cache.put_many(config.embedding_model, ["a"], [[1.0, 0.0]])
+    mocker.patch(
+        "autogpt.llm.llm_utils.chunked_tokens",
+        side_effect=lambda text, **_: [(0,)],
+    )
+
+    async def acreate(input, **_):
+        response = mocker.MagicMock()
+        response.__getitem__.return_value = [{"index": 0, "embedding": [3.0, 4.0]}]
+        return response
+
+    acreate_mock = mocker.patch("openai.Embedding.acreate", side_effect=acreate)
+
+    (embeddings,) = run_concurrently([acreate_embeddings(["a", "b"])])
+    (cached,) = run_concurrently([acreate_embeddings(["b"])])
+
+    assert np.allclose(embeddings, [[1.0, 0.0], [0.6, 0.8]])
+    assert np.allclose(cached, [[0.6, 0.8]])
+    acreate_mock.assert_called_once()
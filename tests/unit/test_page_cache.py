@@ -0,0 +1,119 @@
+import pytest
+
+from autogpt.commands import web_selenium
+from autogpt.commands.web_requests import scrape_text
+from autogpt.processing import text
+from autogpt.processing.page_cache import PageCache, normalize_url, summary_key
+
+URL = "https://example.com/docs"
+HTML = "<html><body><p>Some documentation</p></body></html>"
+
+
+@pytest.fixture
+def page_cache(config, tmp_path, mocker):
+    mocker.patch.object(config, "page_cache", True)
+    PageCache._instances.pop(PageCache, None)
+    yield PageCache(tmp_path / "pages.sqlite3", ttl=60, summary_ttl=60)
+    PageCache._instances.pop(PageCache, None)
+
+
+@pytest.fixture
+def get(mocker):
+    response = mocker.Mock()
+    response.status_code = 200
+    response.text = HTML
+    response.content = HTML.encode()
+    response.headers = {"ETag": '"v1"'}
+    return mocker.patch("requests.Session.get", return_value=response)
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.com:443?b=2&a=1#intro") == (
+        "https://example.com/?a=1&b=2"
+    )
+    assert normalize_url("http://example.com:8080/docs") == (
+        "http://example.com:8080/docs"
+    )
+
+
+def test_summary_key_depends_on_the_page_text():
+    key = summary_key(URL, "text", "What is it?", "gpt-3.5-turbo")
+
+    assert key == summary_key(URL + "#top", "text", " what is  it? ", "gpt-3.5-turbo")
+    assert key != summary_key(URL, "new text", "What is it?", "gpt-3.5-turbo")
+    assert key != summary_key(URL, "text", "What is it?", "gpt-4")
+
+
+def test_fresh_pages_are_not_fetched_again(page_cache, get):
+    assert scrape_text(URL) == "Some documentation"
+    assert scrape_text(URL) == "Some documentation"
+
+    get.assert_called_once()
+
+
+def test_stale_pages_are_revalidated(page_cache, get, mocker):
+    scrape_text(URL)
+    page_cache.ttl = 0
+    get.return_value.status_code = 304
+    get.return_value.content = b""
+    extract = mocker.patch("autogpt.commands.web_requests.extract_text")
+
+    assert scrape_text(URL) == "Some documentation"
+    assert get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    extract.assert_not_called()
+
+
+def test_pages_are_cached_per_extraction_mode(page_cache, get, config, mocker):
+    scrape_text(URL)
+    mocker.patch.object(config, "browse_main_content_only", False)
+    scrape_text(URL)
+
+    assert get.call_count == 2
+    assert page_cache.get_page(URL, "http:main") is not None
+    assert page_cache.get_page(URL, "http:all") is not None
+
+
+def test_rendered_pages_are_not_browsed_again(page_cache, mocker):
+    driver = mocker.Mock()
+    scrape = mocker.patch.object(
+        web_selenium, "scrape_text_with_selenium", return_value=(driver, "Text")
+    )
+    mocker.patch.object(web_selenium, "scrape_links_with_selenium", return_value=["a"])
+    mocker.patch.object(web_selenium, "add_header")
+    mocker.patch.object(text, "summarize_page", return_value="Summary")
+
+    answer, _ = web_selenium.browse_website(URL, "What is it?")
+    cached_answer, cached_driver = web_selenium.browse_website(URL, "What is it?")
+
+    assert cached_answer == answer
+    assert cached_driver is None
+    scrape.assert_called_once()
+    assert page_cache.get_page(URL, "browser:main").links == ["a"]
+
+
+def test_validators_are_kept_when_a_304_omits_them(page_cache, get):
+    get.return_value.headers = {"ETag": '"v1"', "Last-Modified": "Mon, 1 May 2023"}
+    scrape_text(URL)
+    page_cache.ttl = 0
+    get.return_value.status_code = 304
+    get.return_value.content = b""
+    get.return_value.headers = {}
+
+    scrape_text(URL)
+    scrape_text(URL)
+
+    assert get.call_args.kwargs["headers"] == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 1 May 2023",
+    }
+
+
+def test_summaries_are_reused(page_cache, mocker):
+    summarize = mocker.patch.object(text, "summarize_page", return_value="Summary")
+
+    assert text.summarize_text(URL, "Some text", "What is it?") == "Summary"
+    assert text.summarize_text(URL, "Some text", "what is it?") == "Summary"
+    summarize.assert_called_once()
+
+    text.summarize_text(URL, "Changed text", "What is it?")
+    assert summarize.call_count == 2
@@ -0,0 +1,77 @@
+import pytest
+
+from autogpt.llm import llm_utils
+from autogpt.llm.api_manager import ApiManager
+from autogpt.llm.response_cache import ResponseCache, response_key
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    ResponseCache._instances.pop(ResponseCache, None)
+    yield ResponseCache(tmp_path / "responses.sqlite3", ttl=60, max_entries=2)
+    ResponseCache._instances.pop(ResponseCache, None)
+
+
+@pytest.fixture
+def mock_create(config, response_cache, mocker):
+    mocker.patch.object(config, "chat_cache", True)
+    mocker.patch.object(config, "plugins", [])
+    response = mocker.MagicMock()
+    response.choices[0].message = {"content": "Hi"}
+    return mocker.patch.object(
+        ApiManager(), "create_chat_completion", return_value=response
+    )
+
+
+def test_response_key_ignores_surrounding_whitespace():
+    padded = [{"role": "user", "content": " Hello\n"}]
+
+    assert response_key(MESSAGES, "gpt-4", 0, None) == response_key(
+        padded, "gpt-4", 0, None
+    )
+    assert response_key(MESSAGES, "gpt-4", 0, None) != response_key(
+        MESSAGES, "gpt-4", 0, 100
+    )
+
+
+def test_responses_expire(response_cache, mocker):
+    clock = mocker.patch("autogpt.llm.response_cache.time.time", return_value=0)
+    response_cache.put("key", "response")
+
+    assert response_cache.get("key") == "response"
+    clock.return_value = 61
+    assert response_cache.get("key") is None
+    assert response_cache.get_stats() == {"hits": 1, "misses": 1}
+
+
+def test_least_recently_used_responses_are_evicted(response_cache, mocker):
+    clock = mocker.patch("autogpt.llm.response_cache.time.time", return_value=0)
+    response_cache.put("key 1", "response 1")
+    response_cache.put("key 2", "response 2")
+    clock.return_value = 1
+    response_cache.get("key 1")
+    response_cache.put("key 3", "response 3")
+
+    assert response_cache.get("key 1") == "response 1"
+    assert response_cache.get("key 2") is None
+    assert response_cache.get("key 3") == "response 3"
+
+
+def test_deterministic_completions_are_cached(mock_create):
+    for _ in range(2):
+        reply = llm_utils.create_chat_completion(MESSAGES, "gpt-4", temperature=0)
+        assert reply == "Hi"
+
+    mock_create.assert_called_once()
+
+
+def test_sampled_completions_are_cached_only_when_forced(mock_create):
+    for _ in range(2):
+        llm_utils.create_chat_completion(MESSAGES, "gpt-4", temperature=0.7)
+    assert mock_create.call_count == 2
+
+    for _ in range(2):
+        llm_utils.create_chat_completion(MESSAGES, "gpt-4", temperature=0.7, cache=True)
+    assert mock_create.call_count == 3
@@ -0,0 +1,93 @@
+import pytest
+from openai.error import APIError, RateLimitError
+
+from autogpt.llm.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    header_wait,
+    parse_duration,
+)
+
+
+@pytest.fixture
+def clock(mocker):
+    """Fake time that only advances when the retry policy sleeps."""
+    now = [1000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    mocker.patch("autogpt.llm.retry.time.time", side_effect=lambda: now[0])
+    return mocker.patch("autogpt.llm.retry.time.sleep", side_effect=sleep)
+
+
+def failing(errors, mocker):
+    return mocker.Mock(side_effect=[*errors, "ok"])
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("20", 20), ("1.5s", 1.5), ("6m0s", 360), ("20ms", 0.02), ("soon", None)],
+)
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == pytest.approx(expected)
+
+
+def test_header_wait_takes_the_longest_wait():
+    error = RateLimitError(
+        "Error",
+        headers={"Retry-After": "2", "x-ratelimit-reset-tokens": "7s"},
+    )
+
+    assert header_wait(error) == 7
+    assert header_wait(RateLimitError("Error")) is None
+
+
+def test_retry_after_is_honoured(clock, mocker):
+    policy = RetryPolicy(base_delay=0.01, warn_user=False, breaker=CircuitBreaker())
+    func = failing([RateLimitError("Error", headers={"retry-after": "12"})], mocker)
+
+    assert policy.call(func) == "ok"
+    clock.assert_called_once_with(pytest.approx(12))
+
+
+def test_backoff_is_jittered_and_capped(clock, mocker):
+    policy = RetryPolicy(
+        num_retries=5, base_delay=1, max_delay=4, breaker=CircuitBreaker(threshold=99)
+    )
+    func = failing([APIError("Error", http_status=502)] * 5, mocker)
+
+    assert policy.call(func) == "ok"
+    waits = [call.args[0] for call in clock.call_args_list]
+    assert len(waits) == 5
+    assert all(1 <= wait <= 4 for wait in waits)
+
+
+def test_total_wait_is_limited(clock, mocker):
+    policy = RetryPolicy(max_total_wait=30, warn_user=False, breaker=CircuitBreaker())
+    error = RateLimitError("Error", headers={"retry-after": "20"})
+    func = failing([error] * 3, mocker)
+
+    with pytest.raises(RateLimitError):
+        policy.call(func)
+    assert func.call_count == 2
+
+
+def test_open_circuit_pauses_other_callers(clock, mocker):
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record_failure(0)
+    breaker.record_failure(0)
+
+    with pytest.raises(CircuitOpenError):
+        RetryPolicy(max_total_wait=10, breaker=breaker).call(mocker.Mock())
+    assert RetryPolicy(breaker=breaker).call(lambda: "ok") == "ok"
+    assert clock.call_args.args[0] == pytest.approx(60)
+
+
+def test_other_errors_are_not_retried(clock, mocker):
+    func = failing([APIError("Error", http_status=500)], mocker)
+
+    with pytest.raises(APIError):
+        RetryPolicy(breaker=CircuitBreaker()).call(func)
+    clock.assert_not_called()
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from autogpt.llm.scheduler import Priority, RequestScheduler
+
+
+def make_scheduler(rpm, tpm):
+    RequestScheduler._instances.pop(RequestScheduler, None)
+    scheduler = RequestScheduler({"gpt-4": (rpm, tpm)})
+    # keep the limits out of the shared instance used by other tests
+    RequestScheduler._instances.pop(RequestScheduler, None)
+    return scheduler
+
+
+def test_unscheduled_models_are_admitted_right_away():
+    scheduler = make_scheduler(1, 1)
+
+    scheduler.acquire("gpt-3.5-turbo", 10**6)
+
+    assert not scheduler.schedules("gpt-3.5-turbo")
+    assert scheduler.schedules("gpt-4")
+
+
+def test_requests_wait_for_tokens():
+    scheduler = make_scheduler(0, 6000)  # 100 tokens per second
+
+    start = time.monotonic()
+    scheduler.acquire("gpt-4", 6000)
+    scheduler.acquire("gpt-4", 10)
+
+    assert 0.08 <= time.monotonic() - start < 1
+
+
+def test_higher_priority_requests_go_first():
+    scheduler = make_scheduler(600, 0)  # a request every 0.1 seconds
+    bucket, _ = scheduler.limiters["gpt-4"].buckets[0]
+    bucket.level = 0
+    admitted = []
+
+    def request(priority):
+        scheduler.acquire("gpt-4", 1, priority)
+        admitted.append(priority)
+
+    low = threading.Thread(target=request, args=(Priority.LOW,))
+    high = threading.Thread(target=request, args=(Priority.HIGH,))
+    low.start()
+    time.sleep(0.02)
+    high.start()
+    low.join(timeout=5)
+    high.join(timeout=5)
+
+    assert admitted == [Priority.HIGH, Priority.LOW]
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from autogpt.llm.single_flight import SingleFlight
+
+
+@pytest.fixture
+def flight():
+    SingleFlight._instances.pop(SingleFlight, None)
+    yield SingleFlight()
+    SingleFlight._instances.pop(SingleFlight, None)
+
+
+def call_concurrently(flight, mocker, calls):
+    """Run the calls in threads while the first one holds its request open until
+    all of them have claimed their keys."""
+    claim = mocker.spy(flight, "_claim")
+    release = threading.Event()
+    results = [None] * len(calls)
+
+    def run(i):
+        try:
+            results[i] = calls[i](release)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(calls))]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while claim.call_count < len(calls) and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_concurrent_identical_calls_share_one_request(flight, mocker):
+    request = mocker.Mock(return_value="response")
+
+    def call(release):
+        def func():
+            release.wait(5)
+            return request()
+
+        return flight.do("key", func)
+
+    results = call_concurrently(flight, mocker, [call] * 3)
+
+    assert results == ["response"] * 3
+    request.assert_called_once()
+    assert flight.calls == {}
+
+
+def test_errors_are_raised_in_every_waiter(flight, mocker):
+    def call(release):
+        def func():
+            release.wait(5)
+            raise RuntimeError("API down")
+
+        return flight.do("key", func)
+
+    results = call_concurrently(flight, mocker, [call] * 2)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.calls == {}
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+def test_overlapping_batches_only_request_new_keys(flight, mocker):
+    requested = []
+
+    def call_with(keys):
+        def call(release):
+            def func(own):
+                release.wait(5)
+                requested.append([keys[i] for i in own])
+                return [keys[i].upper() for i in own]
+
+            return flight.do_many(keys, func)
+
+        return call
+
+    results = call_concurrently(
+        flight, mocker, [call_with(["a", "b"]), call_with(["b", "c"])]
+    )
+
+    assert results == [["A", "B"], ["B", "C"]]
+    assert sorted(sum(requested, [])) == ["a", "b", "c"]
+
+
+def test_duplicate_keys_in_a_batch_are_requested_once(flight):
+    func = lambda own: [f"result {i}" for i in own]  # noqa: E731
+
+    assert flight.do_many(["a", "b", "a"], func) == [
+        "result 0",
+        "result 1",
+        "result 0",
+    ]
+
+
+def test_async_calls_share_one_request(flight):
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "response"
+
+    async def main():
+        return await asyncio.gather(*[flight.ado("key", request) for _ in range(3)])
+
+    assert asyncio.run(main()) == ["response"] * 3
+    assert len(calls) == 1
@@ -0,0 +1,135 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from autogpt.llm.chat import chat_with_ai
+from autogpt.llm.token_counter import TokenLedger
+from autogpt.memory_management.summary_memory import (
+    get_newly_trimmed_messages,
+    strip_thoughts,
+    update_running_summary,
+    update_running_summary_in_background,
+)
+
+EVENTS = [
+    {"role": "user", "content": "Determine which next command to use"},
+    {
+        "role": "assistant",
+        "content": json.dumps(
+            {"thoughts": {"text": "thinking"}, "command": {"name": "browse"}}
+        ),
+    },
+    {"role": "system", "content": "Command browse returned: a page"},
+]
+
+
+@pytest.fixture
+def agent():
+    agent = MagicMock()
+    agent.summary_memory = {"role": "system", "content": "I was created."}
+    return agent
+
+
+def test_trimmed_messages_are_found_by_index():
+    message = {"role": "user", "content": "Determine which next command to use"}
+    history = [message, {"role": "assistant", "content": "{}"}] * 3
+
+    assert get_newly_trimmed_messages(history, 0, -1) == ([], -1)
+    assert get_newly_trimmed_messages(history, 4, -1) == (history[:4], 3)
+    assert get_newly_trimmed_messages(history, 5, 3) == ([message], 4)
+    assert get_newly_trimmed_messages(history, 4, 4) == ([], 4)
+
+
+def test_strip_thoughts():
+    assert strip_thoughts(EVENTS[1]["content"]) == '{"command": {"name": "browse"}}'
+    assert strip_thoughts("not json") == "not json"
+
+
+def test_update_running_summary(agent, mocker):
+    create = mocker.patch(
+        "autogpt.memory_management.summary_memory.create_chat_completion",
+        return_value="I browsed a page.",
+    )
+
+    summary = update_running_summary(agent, agent.summary_memory, EVENTS)
+
+    assert summary["content"].endswith("I browsed a page.")
+    prompt = create.call_args.args[0][0]["content"]
+    assert "browse" in prompt and "thinking" not in prompt
+    assert json.loads(EVENTS[1]["content"])["thoughts"] == {"text": "thinking"}
+
+
+def test_summary_is_kept_without_new_events(agent, mocker):
+    create = mocker.patch(
+        "autogpt.memory_management.summary_memory.create_chat_completion"
+    )
+
+    summary = update_running_summary(agent, agent.summary_memory, EVENTS[:1])
+
+    assert summary is agent.summary_memory
+    create.assert_not_called()
+
+
+def test_background_update_is_applied_when_done(agent, mocker):
+    mocker.patch(
+        "autogpt.memory_management.summary_memory.create_chat_completion",
+        return_value="I browsed a page.",
+    )
+
+    update_running_summary_in_background(agent, EVENTS).result(timeout=5)
+
+    assert agent.summary_memory["content"].endswith("I browsed a page.")
+
+
+def test_failed_background_update_keeps_the_summary(agent, mocker):
+    mocker.patch(
+        "autogpt.memory_management.summary_memory.create_chat_completion",
+        side_effect=RuntimeError("API down"),
+    )
+    summary = agent.summary_memory
+
+    update_running_summary_in_background(agent, EVENTS).result(timeout=5)
+
+    assert agent.summary_memory is summary
+
+
+@pytest.fixture
+def chat_agent(agent, config, mocker):
+    """An agent whose messages each count 10 tokens, and whose replies are
+    mocked."""
+    mocker.patch.object(config, "background_summary", False)
+    mocker.patch("autogpt.llm.chat.count_message_tokens", return_value=10)
+    mocker.patch("autogpt.llm.token_counter.count_message_tokens", return_value=10)
+    mocker.patch("autogpt.llm.chat.create_chat_completion", return_value="reply")
+    agent.token_ledger = TokenLedger()
+    agent.last_memory_index = -1
+    return agent
+
+
+@pytest.mark.parametrize(
+    # the prompt, user input and memory take 520 tokens, 1000 are for the reply
+    "token_limit, summary_calls",
+    [
+        (1560, 0),  # nothing was trimmed
+        (1550, 0),  # only a user message was trimmed
+        (1540, 1),
+    ],
+)
+def test_chat_only_summarizes_trimmed_messages(
+    chat_agent, mocker, token_limit, summary_calls
+):
+    update = mocker.patch(
+        "autogpt.memory_management.summary_memory.update_running_summary",
+        return_value={"role": "system", "content": "I browsed a page."},
+    )
+    history = [
+        {"role": "user", "content": "Determine which next command to use"},
+        {"role": "assistant", "content": "{}"},
+    ] * 2
+
+    chat_with_ai(chat_agent, "prompt", "input", history, MagicMock(), token_limit)
+
+    assert update.call_count == summary_calls
+    if summary_calls:
+        assert update.call_args.kwargs["new_events"] == [history[1]]
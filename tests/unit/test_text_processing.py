@@ -0,0 +1,193 @@
+import asyncio
+
+import numpy as np
+import pytest
+import spacy
+
+from autogpt.processing import text
+from autogpt.processing.text import get_sentencizer, split_text
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(mocker):
+    """Count one token per word, and split sentences with a blank pipeline."""
+    mocker.patch(
+        "autogpt.processing.text.count_string_tokens",
+        side_effect=lambda string, model: len(string.split()),
+    )
+    mocker.patch(
+        "autogpt.processing.text.count_message_tokens",
+        side_effect=lambda messages, model: 10,
+    )
+    mocker.patch(
+        "autogpt.processing.text.spacy.load",
+        side_effect=lambda name, exclude: spacy.blank("en"),
+    )
+    get_sentencizer.cache_clear()
+    yield
+    get_sentencizer.cache_clear()
+
+
+def test_sentences_are_packed_into_chunks():
+    page = "One two three. Four five.\nSix seven eight nine. Ten."
+
+    chunks = list(split_text(page, max_length=17, model="gpt-3.5-turbo"))
+
+    assert chunks == ["One two three. Four five.", "Six seven eight nine. Ten."]
+
+
+def test_too_long_sentence_raises():
+    with pytest.raises(ValueError, match="Sentence is too long"):
+        list(split_text("One two three four five six seven eight.", max_length=15))
+
+
+def test_pipeline_is_loaded_once():
+    list(split_text("One. Two.", max_length=100))
+    list(split_text("Three. Four.", max_length=100))
+
+    assert text.spacy.load.call_count == 1
+    assert get_sentencizer("en_core_web_sm").pipe_names == ["sentencizer"]
+
+
+def test_summaries_are_packed_into_groups():
+    groups = text.pack_summaries(["a b", "c", "d e f", "g"], "", "gpt-3.5-turbo", 14)
+
+    assert groups == [["a b", "c"], ["d e f"], ["g"]]
+
+
+def test_map_reduce_combines_summaries_in_a_tree(mocker):
+    mocker.patch.object(text.CFG, "browse_chunk_max_length", 13)
+    mocker.patch.object(text.CFG, "browse_summary_workers", 2)
+    running = []
+    prompts = []
+
+    async def summarize(messages, model, priority):
+        prompts.append(messages[0]["content"])
+        running.append(1)
+        assert len(running) <= 2
+        await asyncio.sleep(0.01)
+        running.pop()
+        return "summary"
+
+    mocker.patch("autogpt.processing.text.acreate_chat_completion", summarize)
+
+    summaries, final = text.map_reduce_summaries(
+        [f"chunk {i}" for i in range(6)], "", "gpt-3.5-turbo"
+    )
+
+    assert summaries == ["summary"] * 6
+    assert final == "summary"
+    # 6 chunks, then 3 and 2 combined summaries, then the final summary
+    assert len(prompts) == 12
+
+
+def test_map_reduce_truncates_summaries_that_cannot_be_combined(mocker):
+    mocker.patch.object(text.CFG, "browse_chunk_max_length", 13)
+    # the message around a text takes 11 tokens, leaving 2 for the text
+    mocker.patch.object(
+        text, "create_message", side_effect=lambda text, question: {"content": text}
+    )
+    texts = []
+
+    async def summarize(messages, model, priority):
+        texts.append(messages[0]["content"])
+        return "a long summary"
+
+    mocker.patch("autogpt.processing.text.acreate_chat_completion", summarize)
+
+    summaries, final = text.map_reduce_summaries(
+        [f"chunk{i}" for i in range(6)], "", "gpt-3.5-turbo"
+    )
+
+    assert summaries == ["a long summary"] * 6
+    assert final == "a long summary"
+    assert all(len(text.split()) <= 2 for text in texts)
+
+
+def test_truncate_summary():
+    assert text.truncate_summary("one two three four", "gpt-3.5-turbo", 2) == (
+        "one two"
+    )
+    assert text.truncate_summary("one two", "gpt-3.5-turbo", 5) == "one two"
+
+
+def test_map_reduce_uses_plugins(config, mocker):
+    plugin = mocker.Mock()
+    plugin.can_handle_chat_completion.return_value = True
+    plugin.handle_chat_completion.return_value = "from plugin"
+    mocker.patch.object(config, "plugins", [plugin])
+    acreate = mocker.patch("openai.ChatCompletion.acreate")
+
+    summaries, final = text.map_reduce_summaries(["a", "b"], "", "gpt-3.5-turbo")
+
+    assert summaries == ["from plugin"] * 2
+    assert final == "from plugin"
+    acreate.assert_not_called()
+
+
+VECTORS = {
+    "question": [1, 0],
+    "related": [0.8, 0.6],
+    "unrelated": [0, 1],
+    "same": [1, 0],
+    "opposite": [-1, 0],
+}
+
+
+def embed(chunks):
+    """The embeddings of the chunks followed by that of the question."""
+    return np.array([VECTORS[text] for text in [*chunks, "question"]])
+
+
+def test_relevant_chunks_are_capped_by_count(mocker):
+    mocker.patch.object(text.CFG, "browse_relevant_chunks", 2)
+    mocker.patch.object(text.CFG, "browse_relevance_threshold", -1)
+    chunks = ["related", "unrelated", "same", "opposite"]
+
+    selected = text.select_relevant_chunks(chunks, "question", embed(chunks))
+
+    assert selected == ["related", "same"]
+
+
+def test_relevant_chunks_are_filtered_by_threshold(mocker):
+    mocker.patch.object(text.CFG, "browse_relevant_chunks", 0)
+    mocker.patch.object(text.CFG, "browse_relevance_threshold", 0.5)
+    chunks = ["related", "unrelated", "same", "opposite"]
+
+    selected = text.select_relevant_chunks(chunks, "question", embed(chunks))
+
+    assert selected == ["related", "same"]
+    # the threshold applies even when there are fewer chunks than the cap
+    mocker.patch.object(text.CFG, "browse_relevant_chunks", 5)
+    assert text.select_relevant_chunks(chunks, "question", embed(chunks)) == [
+        "related",
+        "same",
+    ]
+    unrelated = ["unrelated"] * 3
+    assert text.select_relevant_chunks(unrelated, "question", embed(unrelated)) == [
+        "unrelated"
+    ]
+
+
+def test_chunks_are_embedded_once(mocker):
+    mocker.patch.object(text.CFG, "browse_relevant_chunks", 1)
+    mocker.patch.object(text.CFG, "browse_summary_map_reduce", False)
+    mocker.patch.object(text, "split_text", return_value=iter(["a", "b"]))
+    mocker.patch.object(text, "create_chat_completion", return_value="summary")
+    embed = mocker.patch.object(
+        text, "get_ada_embeddings", return_value=np.array([[0, 1], [1, 0], [1, 0]])
+    )
+    memory = mocker.patch.object(text, "get_memory").return_value
+
+    text.summarize_page("https://example.com", "a b", "question", "gpt-4", None)
+
+    texts, embeddings = memory.add_many.call_args_list[0].args
+    assert texts == [
+        "Source: https://example.com\nRaw content part#1: a",
+        "Source: https://example.com\nRaw content part#2: b",
+    ]
+    # the question is embedded in the same request, but not added to memory
+    embed.assert_called_once_with([*texts, "question"])
+    assert embeddings.tolist() == [[0, 1], [1, 0]]
+    # only the relevant chunk and the final summary are summarized
+    assert text.create_chat_completion.call_count == 2